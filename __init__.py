@@ -1,12 +1,12 @@
-import os
+import pkgutil
 from . import _utils
 
 cmdSupport = _utils.cmdSupport
 hint = _utils.hint
 
-for module in os.listdir(os.path.dirname(__file__)):
-    if module in ["__init__.py", "_utils.py"] or module[-3:] != ".py":
+for module in pkgutil.iter_modules(__path__):
+    if module.name in ["_utils"] or module.ispkg:
         continue
-    __import__(module[:-3], globals(), locals(), level=1)
+    __import__(module.name, globals(), locals(), level=1)
 
-del module
+del pkgutil, module
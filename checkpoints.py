@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, glob, time, pickle, shutil
+import numpy as np
+from typing import Union
+
+checkpointVariable = "INTROSPECT_CHECKPOINT_DIR"  # Set by generated commands to a folder kept across retries
+
+
+def checkpointDirectory() -> str:
+    """
+    Folder of checkpoints: `INTROSPECT_CHECKPOINT_DIR` if set, `.checkpoint` in the
+    task directory otherwise.
+    """
+
+    dr = os.environ.get(checkpointVariable)
+    if dr in [None, ""]:
+        dr = ".checkpoint"
+    return dr
+
+
+class Checkpoint:
+    """
+    Handle to persist the state of a long-running master function. A parameter annotated
+    with this class receives a handle; whatever was saved before the task was killed is
+    handed back by `load` when the task is retried.
+    """
+
+    def __init__(
+        self, path: Union[None, str] = None, digest: Union[None, str] = None
+    ):
+        """
+        Parameters
+        ----------
+        path
+            Folder of the checkpoints (see `checkpointDirectory`).
+        digest
+            Hash of the inputs of the task. Checkpoints saved for other inputs (a later
+            run reusing the folder) are discarded instead of resumed.
+        """
+
+        if path is None:
+            path = checkpointDirectory()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.saved = time.time()
+        if digest is not None:
+            fn = self.path + "/.inputs"
+            previous = None
+            if os.path.isfile(fn):
+                with open(fn) as f:
+                    previous = f.read().strip()
+            if previous != digest:
+                self.clear()
+                with open(fn, "w") as f:
+                    f.write(digest + "\n")
+
+    def part(self, key: Union[int, str]) -> "Checkpoint":
+        """
+        Handle of a single element of a chunk, sweep or mapped list, kept in a subfolder
+        so that the elements do not overwrite each other's state.
+
+        Parameters
+        ----------
+        key
+            Label or index of the element.
+        """
+
+        if isinstance(key, int):
+            key = "{:06d}".format(key)
+        return Checkpoint(self.path + "/" + str(key).replace("/", "_"))
+
+    def fileName(self, name: str) -> Union[None, str]:
+        """
+        The file a state is stored in, None if it was never saved.
+        """
+
+        for fn in [self.path + "/" + name + e for e in [".npy", ".pkl"]]:
+            if os.path.isfile(fn):
+                return fn
+        return None
+
+    def save(self, state, name: str = "state") -> str:
+        """
+        Persist a state atomically: it is written to a temporary file first and renamed,
+        so a task killed while writing leaves the previous checkpoint intact. Arrays are
+        stored as `.npy`, anything else pickled.
+
+        Parameters
+        ----------
+        state
+            The object to persist.
+        name
+            Name of the state, if the function keeps more than one.
+
+        Returns
+        -------
+        Path to the checkpoint.
+        """
+
+        ext = ".pkl"
+        if isinstance(state, np.ndarray) and state.dtype != object:
+            ext = ".npy"
+        fn = self.path + "/" + name + ext
+        part = fn + "." + str(os.getpid()) + ".part"
+        with open(part, "wb") as f:
+            if ext == ".npy":
+                np.save(f, state, allow_pickle=False)
+            else:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(part, fn)
+        stale = self.path + "/" + name + (".pkl" if ext == ".npy" else ".npy")
+        if os.path.isfile(stale):
+            os.remove(stale)
+        self.saved = time.time()
+        return fn
+
+    def load(self, name: str = "state", default=None):
+        """
+        The last saved state, or the default if there is no checkpoint (first attempt).
+        """
+
+        fn = self.fileName(name)
+        if fn is None:
+            return default
+        if fn[-4:] == ".npy":
+            return np.load(fn)
+        with open(fn, "rb") as f:
+            return pickle.load(f)
+
+    def exists(self, name: str = "state") -> bool:
+        return self.fileName(name) is not None
+
+    def due(self, interval: float) -> bool:
+        """
+        Check if at least `interval` seconds passed since the last save, to checkpoint
+        periodically from inside a loop.
+        """
+
+        return time.time() - self.saved >= interval
+
+    def clear(self) -> None:
+        """
+        Remove all checkpoints (once the results are safely written).
+        """
+
+        for fn in glob.glob(self.path + "/*"):
+            if os.path.isdir(fn):
+                shutil.rmtree(fn)
+            else:
+                os.remove(fn)
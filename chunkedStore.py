@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, glob, json, shutil, tempfile, contextlib
+import numpy as np
+from typing import Union
+
+indexName = "index.json"  # Index of the chunks in a store folder
+chunkTransform = (
+    ".flatMap{ file(it.toString() + '/chunk_*.npy') }"
+)  # Channel transformation emitting the chunks of stores one by one
+
+
+class chunkedArray:
+    """
+    Writer of an on-disk array store: a folder of `.npy` chunks (split along the first
+    axis) and a JSON index. Master functions append blocks as they are computed and
+    return the store; `save` finalizes it under the output file name.
+    """
+
+    def __init__(
+        self,
+        chunk_rows: Union[None, int] = None,
+        path: Union[None, str] = None,
+    ):
+        """
+        Parameters
+        ----------
+        chunk_rows
+            Number of rows in a chunk. Every appended block becomes a chunk if not set.
+        path
+            Folder of the store. A temporary folder next to the working directory is
+            used until `finalize` moves it to its place if not set.
+        """
+
+        if path is None:
+            path = tempfile.mkdtemp(prefix=".chunked_", dir=os.getcwd())
+        else:
+            os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.chunks = []
+        self.dtype = None
+        self.tail = None
+        self.pending = []
+        self.pending_rows = 0
+
+    def append(self, block: np.ndarray) -> None:
+        """
+        Add rows to the store. Full chunks are written right away, so at most one
+        chunk is held in memory.
+        """
+
+        block = np.asarray(block)
+        if block.ndim == 0:
+            block = block.reshape(1)
+        if self.dtype is None:
+            self.dtype, self.tail = block.dtype, block.shape[1:]
+        elif block.shape[1:] != self.tail:
+            raise ValueError(
+                "Block of shape "
+                + str(block.shape)
+                + " does not fit rows of shape "
+                + str(self.tail)
+                + "!!!"
+            )
+        if self.chunk_rows is None:
+            self.writeChunk(block)
+            return
+        self.pending.append(block)
+        self.pending_rows += block.shape[0]
+        while self.pending_rows >= self.chunk_rows:
+            rows = np.concatenate(self.pending)
+            self.writeChunk(rows[: self.chunk_rows])
+            rest = rows[self.chunk_rows :]
+            self.pending = [rest] if rest.shape[0] > 0 else []
+            self.pending_rows = rest.shape[0]
+
+    def writeChunk(self, rows: np.ndarray) -> None:
+        """
+        Save rows as the next chunk and add it to the index.
+        """
+
+        fn = "chunk_{:06d}.npy".format(len(self.chunks))
+        np.save(os.path.join(self.path, fn), rows.astype(self.dtype, copy=False))
+        self.chunks.append({"file": fn, "rows": int(rows.shape[0])})
+
+    def finalize(self, path: Union[None, str] = None) -> str:
+        """
+        Write the remaining rows and the index, and move the store to its final place.
+
+        Parameters
+        ----------
+        path
+            Final folder of the store (the output file name).
+
+        Returns
+        -------
+        Path to the store.
+        """
+
+        if self.pending_rows > 0:
+            self.writeChunk(np.concatenate(self.pending))
+            self.pending, self.pending_rows = [], 0
+        index = {
+            "dtype": np.dtype(float if self.dtype is None else self.dtype).str,
+            "shape": [sum([c["rows"] for c in self.chunks])] + list(self.tail or []),
+            "chunk_rows": self.chunk_rows,
+            "chunks": self.chunks,
+        }
+        with open(os.path.join(self.path, indexName), "w") as f:
+            json.dump(index, f, indent=1)
+        if path is not None and os.path.realpath(path) != os.path.realpath(self.path):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            shutil.move(self.path, path)
+            self.path = path
+        return self.path
+
+
+@contextlib.contextmanager
+def discardOnError(dr: Union[None, str] = None):
+    """
+    Remove the temporary folders of stores created while the block runs if it raises,
+    so that a failed master function leaves no `.chunked_*` folder behind.
+
+    Parameters
+    ----------
+    dr
+        Folder the stores are created in (the working directory if not set).
+    """
+
+    if dr is None:
+        dr = os.getcwd()
+    pattern = os.path.join(dr, ".chunked_*")
+    before = set(glob.glob(pattern))
+    try:
+        yield
+    except BaseException:
+        for path in set(glob.glob(pattern)) - before:
+            shutil.rmtree(path, ignore_errors=True)
+        raise
+
+
+class chunkedReader:
+    """
+    Lazy reader of an on-disk array store. Chunks are opened memory-mapped and only
+    those overlapping a requested slice of rows are touched.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, indexName)) as f:
+            index = json.load(f)
+        self.path = path
+        self.dtype = np.dtype(index["dtype"])
+        self.shape = tuple(index["shape"])
+        self.files = [c["file"] for c in index["chunks"]]
+        self.offsets = np.cumsum([0] + [c["rows"] for c in index["chunks"]])
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def chunk(self, i: int) -> np.ndarray:
+        """
+        A single chunk, memory-mapped.
+        """
+
+        return np.load(os.path.join(self.path, self.files[i]), mmap_mode="r")
+
+    def __iter__(self):
+        for i in range(len(self.files)):
+            yield self.chunk(i)
+
+    def __getitem__(self, key) -> np.ndarray:
+        rest = tuple()
+        if isinstance(key, tuple):
+            key, rest = key[0], key[1:]
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if key < 0 or key >= len(self):
+                raise IndexError("Row " + str(key) + " is out of range!!!")
+            i = int(np.searchsorted(self.offsets, key, side="right")) - 1
+            return self.chunk(i)[(key - self.offsets[i],) + rest]
+        if not isinstance(key, slice):
+            return np.asarray(self)[(key,) + rest]
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            rows = range(start, stop, step)
+            if len(rows) == 0:
+                return self[0:0][(slice(None),) + rest]
+            lo, hi = min(rows[0], rows[-1]), max(rows[0], rows[-1])
+            return self[lo : hi + 1][::step][(slice(None),) + rest]
+        parts = []
+        first = max(int(np.searchsorted(self.offsets, start, side="right")) - 1, 0)
+        for i in range(first, len(self.files)):
+            if self.offsets[i] >= stop:
+                break
+            lo = max(start - self.offsets[i], 0)
+            hi = min(stop, self.offsets[i + 1]) - self.offsets[i]
+            parts.append(self.chunk(i)[lo:hi])
+        if len(parts) == 0:
+            parts = [np.empty((0,) + self.shape[1:], dtype=self.dtype)]
+        return np.concatenate(parts)[(slice(None),) + rest]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[:], dtype=dtype)
+
+    def __repr__(self):
+        return (
+            "chunkedReader("
+            + repr(self.path)
+            + ", shape="
+            + str(self.shape)
+            + ", chunks="
+            + str(len(self.files))
+            + ")"
+        )
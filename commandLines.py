@@ -1,9 +1,36 @@
-import os, argparse, inspect, textwrap, shutil, re, json
+import os, sys, time, signal, threading, contextlib, argparse, inspect, textwrap
+import shutil, re, math, json, hashlib, asyncio, concurrent.futures
 import numpy as np
 import pandas as pd
 import seaborn as sns
 from matplotlib import pyplot as plt
-from typing import Union, Callable, Sequence, List, Tuple
+from typing import Union, Callable, Sequence, List, Tuple, Iterable
+from . import sharedHandoff, inputCache, chunkedStore, outputManifest, checkpoints
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+sparse = sharedHandoff.sparse
+
+jsonExtensions = [".json", ".jsonl"]  # Outputs written by `writeJson`
+
+cancelSignals = ["SIGTERM", "SIGUSR1", "SIGUSR2"]  # Sent by schedulers before killing a job
+cancelledMarker = ".command.cancelled"  # Written to the task directory on cancellation
+cancelledExit = 75  # Exit status of cancelled tasks (EX_TEMPFAIL), worth a retry
+
+threadVariables = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "INTROSPECT_NUM_THREADS",
+]  # Set to the CPUs of the task in generated Nextflow commands
 
 
 class cmdConnect:
@@ -26,6 +53,18 @@ class cmdConnect:
         Runs the function (function)
     results
         Stores the value(s) returned by the function
+    chunked
+        Parameters receiving a chunk of values; the function is mapped over their elements (list)
+    mapped
+        List parameters split across a process pool; partial results are merged (list)
+    loaded
+        Parameters annotated as array or data frame, loaded lazily from the file argument (dict)
+    streamed
+        Parameters annotated as a stream, receiving an iterator over STDIN or a file (dict)
+    checkpointed
+        Parameters receiving a checkpoint handle, one subfolder per chunk or mapped element; cleared once results are saved (list)
+    cached
+        Loaded parameters parsed through the node-local cache (list)
     save
         Saves the result(s) to file(s) if file output was specified. Prints the result as a string otherwise (function)
     """
@@ -34,6 +73,10 @@ class cmdConnect:
         self,
         fun: Callable,
         paramtune: Union[None, dict] = None,
+        chunked: Union[None, list] = None,
+        chunk_workers: Union[None, int] = None,
+        mapped: Union[None, list] = None,
+        cached: Union[None, bool, list] = None,
     ):
         """
         Adds parameters of the function to argparse.
@@ -49,6 +92,21 @@ class cmdConnect:
             First element of the tuple specifies if the argument is associated with the input (`0`) or the output.
             Last element is a dictionary, passed as keyword arguments to argparse.
             The remaining elements inbetween will be passed as positional arguments (alternative names for the parameter).
+        chunked
+            Parameters that receive a list (chunk) of values on the command line. The function
+            is called once for every element and results are saved to numbered files.
+        chunk_workers
+            Size of the process pool mapping the function over a chunk. Defaults to the
+            CPUs of the task (`INTROSPECT_NUM_THREADS`), runs serially if that is not set.
+        mapped
+            List parameters the function is mapped over inside a single call: the lists
+            are split into slices, the function is called with every slice in a process
+            pool and the partial results are merged in order. Taken from the `mapOver`
+            decorator of the function if not set.
+        cached
+            Parameters loaded from annotations (see `loaded`) that go through the
+            node-local cache of `inputCache`, so that concurrent tasks on the same node
+            parse a reference table only once. True caches all of them.
         """
 
         finetuned = {
@@ -67,6 +125,12 @@ class cmdConnect:
         finetuned.update(paramtune)
         paramtune = finetuned.copy()
         argreverse = dict()
+        loaded = dict()
+        arrays = dict()
+        streamed = dict()
+        checkpointed = []
+        if chunked is None:
+            chunked = []
 
         # Collect information on the master function and its parameters
         doc = self.parseDocstring(fun)
@@ -76,6 +140,7 @@ class cmdConnect:
         parser = argparse.ArgumentParser(
             description=doc["description"],
             formatter_class=argparse.RawTextHelpFormatter,
+            fromfile_prefix_chars="@",
         )
 
         arglist = list()
@@ -134,6 +199,15 @@ class cmdConnect:
             help="Peek into the results by printing or saving the first N lines only",
         )
         parser.register("action", "exappend", self.ExtendAction)
+        parser.register("action", "arrayappend", self.ArrayExtendAction)
+
+        # Long lists and dictionaries can be passed in a JSON file instead of argv
+        parser.add_argument(
+            "--args-json",
+            dest="argsJson",
+            action="append",
+            help="JSON file with values of parameters (keyed by name), replacing those given on the command line",
+        )
 
         # Add an instance for every parameter of the master function to the main argparse parser
         for p in arglist:
@@ -150,7 +224,7 @@ class cmdConnect:
                 t = [0, p]
             if tune:
                 if type(t[-1]) == dict:
-                    kwargs = t[-1]
+                    kwargs = dict(t[-1])
                     args = t[1:-1]
                 else:
                     kwargs = dict()
@@ -164,7 +238,15 @@ class cmdConnect:
                 if "type" not in kwargs:
                     if p in spect.annotations:
                         tp = spect.annotations[p]
-                        if tp in (int, float, list, tuple):
+                        if tp in sharedHandoff.loadedTypes:
+                            loaded[p] = tp
+                        elif tp in (StdinLines, StdinRecords):
+                            streamed[p] = tp
+                        elif tp is checkpoints.Checkpoint:
+                            checkpointed.append(p)
+                            if "default" not in kwargs:
+                                kwargs["default"] = None
+                        elif tp in (int, float, list, tuple):
                             kwargs["type"] = tp
                         else:
                             try:
@@ -172,6 +254,14 @@ class cmdConnect:
                                     kwargs["type"] = list
                             except:
                                 pass
+                # Chunked parameters receive a list of the values the function expects
+                if p in chunked:
+                    if kwargs.get("type") is int:
+                        kwargs["type"] = "int_list"
+                    elif kwargs.get("type") is float:
+                        kwargs["type"] = "float_list"
+                    elif kwargs.get("type") not in [tuple, "str_list"]:
+                        kwargs["type"] = list
                 # Solve the comma or space problem
                 if "type" in kwargs:
                     if kwargs["type"] in [
@@ -180,21 +270,31 @@ class cmdConnect:
                         "str_list",
                         "int_list",
                         "float_list",
+                        "int_array",
+                        "float_array",
                     ]:
                         if "nargs" not in kwargs:
                             kwargs["nargs"] = "*"
                         if "action" not in kwargs:
                             kwargs["action"] = "exappend"
+                            if kwargs["type"] in ["int_array", "float_array"]:
+                                kwargs["action"] = "arrayappend"
                             if "default" in kwargs:
                                 if kwargs["default"] is not None:
                                     kwargs["default"] = []
-                        if kwargs["type"] in ["int_list", "float_list"]:
+                        if kwargs["type"] in ["int_array", "float_array"]:
+                            arrays[kwargs.get("dest", p)] = kwargs["type"][:-6]
+                            if kwargs["type"] == "int_array":
+                                kwargs["type"] = self.intArraySplitter
+                            else:
+                                kwargs["type"] = self.floatArraySplitter
+                        elif kwargs["type"] in ["int_list", "float_list"]:
                             if kwargs["type"] == "int_list":
                                 kwargs["type"] = self.intSplitter
                             else:
                                 kwargs["type"] = self.floatSplitter
                         else:
-                            kwargs["type"] = lambda s: s.split(",")
+                            kwargs["type"] = self.stringSplitter
                 if "default" in kwargs and len(t) < 3:
                     kwargs["dest"] = p
                     args[0] = "--" + p
@@ -202,6 +302,11 @@ class cmdConnect:
                     argreverse[kwargs["dest"]] = args[0] + " "
                 else:
                     argreverse[args[0]] = ""
+                # Streamed parameters read STDIN unless a file is given
+                if p in streamed and "default" not in kwargs:
+                    kwargs["default"] = "-"
+                    if args[0][0] != "-":
+                        kwargs["nargs"] = "?"
                 parser.add_argument(*args, **kwargs)
             else:
                 parser.add_argument(p, help=help_msg)
@@ -218,7 +323,7 @@ class cmdConnect:
                     returnlen = o
             else:
                 if type(t[-1]) == dict:
-                    kwargs = t[-1]
+                    kwargs = dict(t[-1])
                     args = t[1:-1]
                 else:
                     kwargs = dict()
@@ -231,6 +336,25 @@ class cmdConnect:
                     returnlen = o
                 parser.add_argument(*args, **kwargs)
 
+        # Chunk elements can be labelled to name their output files
+        if len(chunked) > 0:
+            parser.add_argument(
+                "--chunkLabels",
+                dest="chunkLabels",
+                nargs="*",
+                action="exappend",
+                type=self.stringSplitter,
+                help="Labels of chunk elements used in output file names instead of their index",
+            )
+            parser.add_argument(
+                "--chunkLabelInputs",
+                dest="chunkLabelInputs",
+                nargs="*",
+                action="exappend",
+                type=self.stringSplitter,
+                help="Parameters whose values (file content) are mixed into the chunk labels",
+            )
+
         rl = []
         for i in range(returnlen):
             rl.append([outnames.pop(i + 1, None), None])
@@ -243,6 +367,23 @@ class cmdConnect:
         self.cmd_args = parser
         self.argreverse = argreverse
         self.results = rl
+        self.chunked = chunked
+        self.loaded = loaded
+        self.arrays = arrays
+        self.streamed = streamed
+        self.checkpointed = checkpointed
+        if cached is True:
+            cached = list(loaded.keys())
+        if cached in [None, False]:
+            cached = []
+        self.cached = cached
+        if chunk_workers is None:
+            chunk_workers = availableThreads()
+        self.chunk_workers = chunk_workers
+        if mapped is None:
+            mapped = getattr(fun, "mapOver", [])
+        self.mapped = mapped
+        self.map_chunksize = getattr(fun, "mapChunksize", None)
 
     class ExtendAction(argparse.Action):
         """
@@ -257,12 +398,74 @@ class cmdConnect:
                 items += v
             setattr(namespace, self.dest, items)
 
-    def eval(self):
+    class ArrayExtendAction(argparse.Action):
+        """
+        Concatenate NumPy arrays parsed from multiple list notations in command line.
+        """
+
+        def __call__(self, parser, namespace, values, option_string=None):
+            items = getattr(namespace, self.dest)
+            if not isinstance(items, np.ndarray):
+                items = None
+            for v in values:
+                if items is None:
+                    items = v
+                else:
+                    items = np.concatenate([items, v])
+            setattr(namespace, self.dest, items)
+
+    def eval(
+        self, argv: Union[None, list] = None, preloaded: Union[None, dict] = None
+    ):
         """
         Run the master function and store its results.
+
+        Parameters
+        ----------
+        argv
+            Command line arguments to parse instead of those the script was called with.
+        preloaded
+            Objects to pass to the function instead of the parsed value of the parameter.
         """
 
-        self.args, rest = self.cmd_args.parse_known_args()
+        self.args, rest = self.cmd_args.parse_known_args(argv)
+        for fn in self.args.argsJson or []:
+            with open(fn) as f:
+                for k, v in json.load(f).items():
+                    if k in self.arrays:
+                        v = np.asarray(v, dtype=self.arrays[k])
+                    setattr(self.args, k, v)
+        labelled = getattr(self.args, "chunkLabelInputs", None) or []
+        labelled = [getattr(self.args, p, None) for p in labelled]
+        if len(self.checkpointed) > 0:
+            digest = [getattr(self.args, p, None) for p in self.params]
+            digest = inputDigest(
+                [v for p, v in zip(self.params, digest) if p not in self.checkpointed]
+                + rest
+            )
+        for p in self.checkpointed:
+            v = checkpoints.Checkpoint(getattr(self.args, p, None), digest)
+            setattr(self.args, p, v)
+        for p, tp in self.streamed.items():
+            v = getattr(self.args, p, None)
+            if isinstance(v, str):
+                setattr(self.args, p, streamLines(v, tp is StdinRecords))
+        if preloaded is None:
+            preloaded = dict()
+        for p, tp in self.loaded.items():
+            v = getattr(self.args, p, None)
+            if p in preloaded or v is None:
+                continue
+            loader = None
+            if p in self.cached:
+                loader = inputCache.cachedInput
+            if isinstance(v, list):
+                v = [sharedHandoff.lazyInput(x, tp, loader) for x in v]
+            else:
+                v = sharedHandoff.lazyInput(v, tp, loader)
+            setattr(self.args, p, v)
+        for k, v in preloaded.items():
+            setattr(self.args, k, v)
         args, kwargs = [], dict()
         spected = self.spect.args
         for p in self.params:
@@ -270,39 +473,201 @@ class cmdConnect:
                 args.append(getattr(self.args, p))
             else:
                 kwargs[p] = getattr(self.args, p)
-        rs = self.fun(*args, *rest, **kwargs)
 
-        if rs is not None:
-            if len(self.results) > 1:
-                for i in range(len(rs)):
-                    try:
-                        resfile = self.results[i][0]
+        if len(self.chunked) > 0:
+            calls = []
+            chunks = [getattr(self.args, p) or [] for p in self.chunked]
+            n = min([len(c) for c in chunks])
+            labels = self.args.chunkLabels
+            if labels is None or len(labels) < n:
+                labels = list(range(n))
+            elif len(labelled) > 0:
+                labels = inputLabels(labels, labelled)
+            for j in range(n):
+                elements = dict([(p, c[j]) for p, c in zip(self.chunked, chunks)])
+                for p in self.checkpointed:
+                    elements[p] = getattr(self.args, p).part(labels[j])
+                a = [elements.get(p, v) for p, v in zip(spected, args)]
+                kw = dict([(p, elements.get(p, v)) for p, v in kwargs.items()])
+                calls.append((a + rest, kw))
+            collected = []
+            for j, rs in enumerate(self.mapCalls(calls, self.chunk_workers)):
+                if rs is not None:
+                    for resfile, r in self.collectResults(rs):
                         if resfile is not None:
-                            resfile = getattr(self.args, resfile)
-                    except:
-                        resfile = None
-                    try:
-                        self.results[i] = (resfile, rs[i])
-                    except:
-                        self.results.append((resfile, rs[i]))
-            else:
+                            resfile = chunkedFileName(resfile, labels[j])
+                        collected.append((resfile, r))
+            if len(collected) > 0:
+                self.results = collected
+        elif len(self.mapped) > 0:
+            rs = self.mergeResults(
+                self.mapCalls(
+                    self.mappedCalls(args + rest, kwargs),
+                    availableThreads(os.cpu_count()),
+                )
+            )
+            if rs is not None:
+                self.results = self.collectResults(rs)
+        else:
+            with chunkedStore.discardOnError():
+                rs = awaitResult(self.fun(*args, *rest, **kwargs))
+            if rs is not None:
+                self.results = self.collectResults(rs)
+        return
+
+    def mappedCalls(self, args: list, kwargs: dict) -> list:
+        """
+        Split the mapped list parameters into slices, one call per slice.
+
+        Parameters
+        ----------
+        args
+            Positional arguments of the master function.
+        kwargs
+            Keyword arguments of the master function.
+
+        Returns
+        -------
+        A list of (positional arguments, keyword arguments) tuples.
+        """
+
+        spected = self.spect.args
+        values = dict(zip(spected, args))
+        values.update(kwargs)
+        n = min(
+            [len(values[p]) if values.get(p) is not None else 0 for p in self.mapped]
+        )  # Arrays have no truth value
+        if n == 0:
+            return [(args, kwargs)]
+        size = self.map_chunksize
+        if size is None:
+            size = -(-n // (availableThreads(os.cpu_count()) or 1))
+        calls = []
+        for s in range(0, n, size):
+            elements = dict([(p, values[p][s : s + size]) for p in self.mapped])
+            for p in self.checkpointed:
+                elements[p] = values[p].part(str(s) + "-" + str(min(s + size, n)))
+            a = [elements.get(p, v) for p, v in zip(spected, args)]
+            a += args[len(spected) :]
+            kw = dict([(p, elements.get(p, v)) for p, v in kwargs.items()])
+            calls.append((a, kw))
+        return calls
+
+    def mergeResults(self, parts: list):
+        """
+        Merge the partial results of mapped calls, keeping the order of the slices.
+        Lists and tuples are concatenated, data frames and arrays stacked, dictionaries
+        updated. Multiple outputs are merged one by one.
+
+        Parameters
+        ----------
+        parts
+            Values returned by the master function for every slice.
+
+        Returns
+        -------
+        The merged result(s).
+        """
+
+        parts = [r for r in parts if r is not None]
+        if len(parts) == 0:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+        if len(self.results) > 1:
+            return tuple(
+                [mergeParts([r[i] for r in parts]) for i in range(len(parts[0]))]
+            )
+        return mergeParts(parts)
+
+    def collectResults(self, rs) -> list:
+        """
+        Pair the value(s) returned by the master function with the output file names.
+
+        Parameters
+        ----------
+        rs
+            Value(s) returned by the master function.
+
+        Returns
+        -------
+        List of (file name, result) tuples.
+        """
+
+        results = list(self.results)
+        if len(results) > 1:
+            streamed = inspect.isgenerator(rs) or inspect.isasyncgen(rs)
+            streamed = streamed or inspect.isgeneratorfunction(self.fun)
+            if streamed or inspect.isasyncgenfunction(self.fun):
+                raise ValueError(
+                    "Rows are streamed to a single output only, but "
+                    + self.fun.__name__
+                    + " has "
+                    + str(len(results))
+                    + "; return a tuple of generators instead!!!"
+                )
+            for i in range(len(rs)):
                 try:
-                    resfile = self.results[0][0]
+                    resfile = results[i][0]
                     if resfile is not None:
                         resfile = getattr(self.args, resfile)
                 except:
                     resfile = None
-                self.results = [(resfile, rs)]
-        return
+                try:
+                    results[i] = (resfile, rs[i])
+                except:
+                    results.append((resfile, rs[i]))
+        else:
+            try:
+                resfile = results[0][0]
+                if resfile is not None:
+                    resfile = getattr(self.args, resfile)
+            except:
+                resfile = None
+            results = [(resfile, rs)]
+        return results
+
+    def mapCalls(self, calls: list, workers: Union[None, int] = None) -> list:
+        """
+        Call the master function with every set of arguments, in a process pool if asked to.
+
+        Parameters
+        ----------
+        calls
+            A list of (positional arguments, keyword arguments) tuples.
+        workers
+            Size of the process pool. Calls are made serially if not set.
+
+        Returns
+        -------
+        Results of the calls, in the order of the arguments.
+        """
+
+        with chunkedStore.discardOnError():
+            if workers is None or workers < 2 or len(calls) < 2:
+                return [callCollected(self.fun, *a, **kw) for a, kw in calls]
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=pinWorker
+            ) as pool:
+                futures = [
+                    pool.submit(callCollected, self.fun, *a, **kw) for a, kw in calls
+                ]
+                return [f.result() for f in futures]
 
     def save(
         self,
         filenames: Union[None, str, list] = None,
         formatfunctions: Union[None, Callable, list] = None,
         formatargs: Union[None, dict, list] = None,
+        workers: Union[None, int] = None,
+        report: bool = False,
+        manifest: bool = False,
     ) -> None:
         """
         Save the output of the master function.
+        Outputs written to files are saved concurrently on a thread pool, figures and
+        printed outputs in order on the calling thread. Every result is released as
+        soon as it has been written.
 
         Parameters
         ----------
@@ -312,6 +677,13 @@ class cmdConnect:
             Specify how the output should be formatted. Using default formatters, (e.g. every list element in a new line) if not set.
         formatargs
             A dictionary of arguments for each format function that will be passed on.
+        workers
+            Size of the thread pool. Defaults to the CPUs of the task (at most 4 if not known).
+        report
+            Print the time it took to write each output to STDERR (also kept in `write_times`).
+        manifest
+            Write `<outFile>.manifest.json` next to every output with its size, row count
+            and a checksum computed while the file is written.
         """
 
         N = len(self.results)
@@ -336,13 +708,25 @@ class cmdConnect:
             for i in range(N):
                 formatargs.append(dict())
 
-        for i in range(N):
-            o = ""
-            fn, r = self.results[i]
+        def saveOutput(i: int, fn: Union[None, str], r) -> None:
+            if sparse is not None and sparse.issparse(r):
+                writeSparse(r, fn)
+                return
+            if isinstance(r, chunkedStore.chunkedArray):
+                r = r.finalize(fn)
+                if fn is None:
+                    print(r)
+                return
             to_be_written = True
             if fn is not None:
-                if fn[-5:] in ".json":
+                if os.path.splitext(fn)[1] in jsonExtensions:
                     to_be_written = False
+            if to_be_written and (inspect.isgenerator(r) or inspect.isasyncgen(r)):
+                limit = None
+                if self.args.displayMax is not None:
+                    limit = int(self.args.displayMax[0])
+                streamRows(r, fn, limit, opener=outputManifest.openOutput)
+                return
             if to_be_written:
                 if formatfunctions[i] is None:
                     if isinstance(r, (pd.DataFrame, plt.Axes, sns.matrix.ClusterGrid)):
@@ -516,8 +900,11 @@ class cmdConnect:
                                 )
                 else:
                     r = formatfunctions[i](**formatargs[i])
+            else:
+                writeJson(r, fn)
+                return
             if self.args.displayMax is not None and not isinstance(
-                r, plt.Axes, sns.matrix.ClusterGrid
+                r, (plt.Axes, sns.matrix.ClusterGrid)
             ):
                 rN = self.args.displayMax
                 if isinstance(r, pd.DataFrame):
@@ -551,7 +938,8 @@ class cmdConnect:
                 ):
                     if isinstance(r, (list, pd.DataFrame)):
                         if isinstance(r, pd.DataFrame):
-                            r.to_csv(fn, sep="\t")
+                            with outputManifest.openOutput(fn, "w") as f:
+                                r.to_csv(f, sep="\t")
                         else:  # TODO: refactor this part into a separate figsaver function
                             tx = []
                             if isinstance(r[0], plt.Axes):
@@ -605,12 +993,76 @@ class cmdConnect:
                         else:
                             r.savefig(fn)
                 else:
-                    if fn[-5:] == ".json":
-                        with open(fn, "w") as f:
-                            json.dump(r, f)
-                    else:
-                        with open(fn, "w") as f:
-                            f.write(r)
+                    with outputManifest.openOutput(fn, "w") as f:
+                        f.write(r)
+            return
+
+        figures, jobs = [], []
+        for i in range(N):
+            fn, r = self.results[i]
+            job = (i, fn, r, saveOutput)
+            if fn is None or isFigure(r):
+                figures.append(job)  # Printed in order or drawn by (not thread-safe) pyplot
+            else:
+                jobs.append(job)
+            r = None
+        if workers is None:
+            workers = min(len(jobs), availableThreads(4))
+        self.write_times = dict()
+        self.manifest = manifest
+        if workers < 2 or len(jobs) < 2:
+            figures = sorted(jobs + figures, key=lambda x: x[0])
+            jobs = []
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1))
+        try:
+            futures = [pool.submit(self.saveTimed, *job) for job in jobs]
+            jobs = []
+            while len(figures) > 0:
+                self.saveTimed(*figures.pop(0))
+            for f in futures:
+                f.result()
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)  # Queued writes are dropped
+            raise
+        pool.shutdown()
+        for p in self.checkpointed:
+            getattr(self.args, p).clear()
+        if report:
+            for i, (fn, seconds) in sorted(self.write_times.items()):
+                if fn is not None:
+                    print(
+                        "Saved output " + str(i + 1) + " to " + fn,
+                        "in {:.3f} s".format(seconds),
+                        file=sys.stderr,
+                    )
+        return
+
+    def saveTimed(
+        self, i: int, fn: Union[None, str], r, saveOutput: Callable
+    ) -> None:
+        """
+        Save a single result with the given writer and release it once the file is
+        closed, recording the wall time (and the manifest if asked to).
+        """
+
+        started = time.time()
+        hashed = fn is not None and getattr(self, "manifest", False)
+        rows = None
+        if hashed:
+            peeked = getattr(self.args, "displayMax", None) is not None
+            if hasattr(r, "__len__") and not isinstance(r, (str, bytes)) and not peeked:
+                rows = len(r)  # Unknown under --peek, only lines count the file then
+            outputManifest.hashedOutputs.add(os.path.realpath(fn))
+        try:
+            saveOutput(i, fn, r)
+        finally:
+            r = None
+            self.results[i] = (fn, None)
+            if hashed:
+                outputManifest.hashedOutputs.discard(os.path.realpath(fn))
+        if hashed:
+            outputManifest.writeManifest(fn, rows)
+        self.write_times[i] = (fn, time.time() - started)
         return
 
     def parseDocstring(self, fun: Callable) -> dict:
@@ -679,7 +1131,25 @@ class cmdConnect:
             "returns": returns,
         }
 
-    def intSplitter(self, s: str) -> list:
+    @staticmethod
+    def stringSplitter(s: str) -> list:
+        """
+        Split a string into list of strings.
+
+        Parameters
+        ----------
+        s
+            The string(s) supplied via command line.
+
+        Returns
+        -------
+        List of strings.
+        """
+
+        return s.split(",")
+
+    @staticmethod
+    def intSplitter(s: str) -> list:
         """
         Split a string into list of integers.
         Changes NaN to zero.
@@ -703,7 +1173,51 @@ class cmdConnect:
             l.append(e)
         return l
 
-    def floatSplitter(self, s: str) -> list:
+    def intArraySplitter(self, s: str) -> np.ndarray:
+        """
+        Parse a comma separated string into an array of integers in one go.
+        Changes NaN to zero.
+
+        Parameters
+        ----------
+        s
+            The string(s) supplied via command line.
+
+        Returns
+        -------
+        Array of integers.
+        """
+
+        try:
+            return np.array(s.split(","), dtype=int)
+        except ValueError:
+            return self.floatArraySplitter(s).astype(int)
+
+    def floatArraySplitter(self, s: str) -> np.ndarray:
+        """
+        Parse a comma separated string into an array of floats in one go.
+        Changes NaN and values that are not numbers to zero.
+
+        Parameters
+        ----------
+        s
+            The string(s) supplied via command line.
+
+        Returns
+        -------
+        Array of floats.
+        """
+
+        try:
+            a = np.array(s.split(","), dtype=float)
+        except ValueError:
+            a = pd.to_numeric(pd.Series(s.split(",")), errors="coerce").to_numpy(
+                dtype=float
+            )
+        return np.nan_to_num(a, nan=0.0)
+
+    @staticmethod
+    def floatSplitter(s: str) -> list:
         """
         Split a string into list of floats.
         Changes NaN to zero.
@@ -728,8 +1242,613 @@ class cmdConnect:
         return l
 
 
+class TaskCancelled(BaseException):
+    """
+    Raised inside the running master function (or the generator being saved) when the
+    scheduler signals that the job is about to be killed. Not an `Exception`, so that
+    broad exception handlers of the master function do not swallow it.
+    """
+
+    def __init__(self, signum: int):
+        self.signum = signum
+        super().__init__("Task cancelled by " + signal.Signals(signum).name)
+
+
+@contextlib.contextmanager
+def cancellable(marker: str = cancelledMarker):
+    """
+    Turn the termination signals of schedulers (SGE sends SIGUSR1/SIGUSR2 with `-notify`,
+    then SIGTERM) into a `TaskCancelled` exception while the master function runs and its
+    results are saved. Rows a generator has already yielded are flushed by `streamRows`.
+    A marker file records the signal, and the process exits with status 75, so that a
+    truncated result can be told apart from a crash and the task requeued.
+
+    Parameters
+    ----------
+    marker
+        Path of the marker file.
+    """
+
+    def handler(signum, frame):
+        with open(marker, "w") as f:
+            json.dump({"signal": signal.Signals(signum).name, "time": time.time()}, f)
+        raise TaskCancelled(signum)
+
+    previous = dict()
+    if threading.current_thread() is threading.main_thread():
+        for name in cancelSignals:
+            if hasattr(signal, name):
+                signum = getattr(signal, name)
+                previous[signum] = signal.signal(signum, handler)
+    try:
+        yield
+    except TaskCancelled as e:
+        print(str(e) + ", partial results are kept", file=sys.stderr)
+        raise SystemExit(cancelledExit)
+    finally:
+        for signum, h in previous.items():
+            signal.signal(signum, h)
+
+
+def isFigure(r) -> bool:
+    """
+    Check if a result is drawn with matplotlib (a single plot or a list of plots).
+    """
+
+    if isinstance(r, (list, tuple)) and len(r) > 0:
+        r = r[0]
+        if isinstance(r, (list, tuple)) and len(r) > 0:
+            r = r[0]
+    return isinstance(r, (plt.Axes, plt.Figure, sns.matrix.ClusterGrid))
+
+
+def pinWorker() -> None:
+    """
+    Initializer of in-task process pools: every worker gets a single BLAS/OpenMP
+    thread, so that a pool of `${task.cpus}` workers does not run cpus² threads.
+    Libraries already loaded (inherited by forking) are limited through threadpoolctl
+    if it is installed, the variables take care of those loaded later.
+    """
+
+    for v in threadVariables:
+        os.environ[v] = "1"
+    if threadpoolctl is not None:
+        threadpoolctl.threadpool_limits(1)
+
+
+def availableThreads(default: Union[None, int] = None) -> Union[None, int]:
+    """
+    Number of CPUs the task may use, as exported by the generated Nextflow command.
+
+    Parameters
+    ----------
+    default
+        Returned if the variable is not set.
+
+    Returns
+    -------
+    Value of `INTROSPECT_NUM_THREADS`.
+    """
+
+    try:
+        return max(1, int(os.environ["INTROSPECT_NUM_THREADS"]))
+    except:
+        return default
+
+
+def awaitResult(rs):
+    """
+    Run the coroutine returned by an `async def` master function on an event loop.
+    Anything else, including (async) generators streamed by `save`, is returned as it is.
+
+    Parameters
+    ----------
+    rs
+        Value returned by the master function.
+
+    Returns
+    -------
+    The result of the function.
+    """
+
+    if inspect.isawaitable(rs):
+        return asyncio.run(rs)
+    return rs
+
+
+def callCollected(fun: Callable, *args, **kwargs):
+    """
+    Call a (possibly async) master function and collect generated rows into a list,
+    so that the result can be sent back from a worker process.
+    """
+
+    rs = awaitResult(fun(*args, **kwargs))
+    if inspect.isasyncgen(rs):
+
+        async def collect():
+            return [row async for row in rs]
+
+        return asyncio.run(collect())
+    if inspect.isgenerator(rs):
+        return list(rs)
+    return rs
+
+
+async def gatherBounded(
+    aws: Iterable,
+    limit: int = 16,
+    return_exceptions: bool = False,
+) -> list:
+    """
+    Await coroutines with at most `limit` of them running at the same time. Fan-out
+    helper for I/O bound async master functions (reading many files, querying a database).
+
+    Parameters
+    ----------
+    aws
+        Coroutines or other awaitables. A generator is consumed lazily, so coroutines
+        are only created when there is a free slot.
+    limit
+        Maximum number of awaitables in flight.
+    return_exceptions
+        Return exceptions in place of results instead of raising the first one.
+        Cancellation of the task (`TaskCancelled`) is raised all the same.
+
+    Returns
+    -------
+    Results in the order of the awaitables. If one of them raises, the others still
+    in flight are cancelled before the exception propagates.
+    """
+
+    if limit < 1:
+        raise ValueError("Concurrency limit has to be at least 1!!!")
+    pending = enumerate(aws)
+    results = dict()
+
+    async def worker():
+        for i, aw in pending:
+            try:
+                results[i] = await aw
+            except Exception as e:  # TaskCancelled is not caught here
+                if not return_exceptions:
+                    raise
+                results[i] = e
+
+    workers = [asyncio.ensure_future(worker()) for w in range(limit)]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+    return [results[i] for i in range(len(results))]
+
+
+def jsonDefault(o):
+    """
+    Encode NumPy and pandas objects (and sets) the JSON encoder does not know.
+    Data frames become a list of records, with the index as a column if it is not the default.
+    """
+
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, pd.DataFrame):
+        if not isinstance(o.index, pd.RangeIndex):
+            o = o.reset_index()
+        return o.to_dict(orient="records")
+    if isinstance(o, pd.Series):
+        return o.to_dict()
+    if isinstance(o, (pd.Timestamp, pd.Timedelta)):
+        return o.isoformat()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if o is pd.NA or o is pd.NaT:
+        return None
+    raise TypeError("Object of type " + type(o).__name__ + " is not JSON serializable")
+
+
+def jsonFinite(o):
+    """
+    Replace NaN and infinite floats with None in (nested) dicts, lists and tuples, the
+    way orjson writes them, so that the output is valid JSON with either encoder.
+    """
+
+    if isinstance(o, float):
+        if math.isfinite(o):
+            return o
+        return None
+    if isinstance(o, dict):
+        return dict([(k, jsonFinite(v)) for k, v in o.items()])
+    if isinstance(o, (list, tuple)):
+        return [jsonFinite(v) for v in o]
+    return o
+
+
+def jsonDumps(r) -> bytes:
+    """
+    Encode an object as JSON, with orjson if it is installed. Both encoders write NaN
+    and infinite values as null.
+    """
+
+    if orjson is not None:
+        return orjson.dumps(
+            r,
+            default=jsonDefault,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        jsonFinite(r), default=lambda o: jsonFinite(jsonDefault(o)), allow_nan=False
+    ).encode()
+
+
+def writeJson(r, fn: str) -> None:
+    """
+    Write a result as JSON. For `.jsonl` files, records (elements of lists, arrays,
+    generators or rows of a data frame) are written one per line as they come, so
+    generated records are never collected in memory.
+
+    Parameters
+    ----------
+    r
+        The result of the master function.
+    fn
+        The output file (`.json` or `.jsonl`).
+    """
+
+    if os.path.splitext(fn)[1] != ".jsonl":
+        if inspect.isgenerator(r) or inspect.isasyncgen(r):
+            r = callCollected(lambda: r)
+        with outputManifest.openOutput(fn, "wb") as f:
+            f.write(jsonDumps(r))
+        return
+    if isinstance(r, pd.DataFrame):
+        if not isinstance(r.index, pd.RangeIndex):
+            r = r.reset_index()
+        with outputManifest.openOutput(fn, "w") as f:
+            r.to_json(f, orient="records", lines=True)
+        return
+    if isinstance(r, dict):
+        r = [{k: v} for k, v in r.items()]
+    with outputManifest.openOutput(fn, "wb") as f:
+        if inspect.isasyncgen(r):
+
+            async def drain():
+                async for e in r:
+                    f.write(jsonDumps(e) + b"\n")
+
+            asyncio.run(drain())
+        else:
+            for e in r:
+                f.write(jsonDumps(e) + b"\n")
+    return
+
+
+def writeSparse(r, fn: Union[None, str] = None, chunksize: int = 1000000) -> None:
+    """
+    Write a sparse matrix without densifying it: Matrix Market (real, integer or
+    complex field) for `.mtx` files, streamed in chunks of non-zero entries,
+    `scipy.sparse.save_npz` otherwise.
+
+    Parameters
+    ----------
+    r
+        The sparse matrix.
+    fn
+        The output file. A short description is printed if not set.
+    chunksize
+        Number of entries formatted at once for Matrix Market.
+    """
+
+    if fn is None:
+        print(
+            type(r).__name__
+            + " of shape "
+            + str(r.shape)
+            + " with "
+            + str(r.nnz)
+            + " stored elements"
+        )
+        return
+    if os.path.splitext(fn)[1] != ".mtx":
+        with outputManifest.openOutput(fn, "wb") as f:
+            sparse.save_npz(f, r)
+        return
+    r = r.tocoo()
+    field, fmt = "real", "%d %d %.17g"
+    if np.issubdtype(r.dtype, np.integer) or r.dtype == bool:
+        field, fmt = "integer", "%d %d %d"
+    if np.iscomplexobj(r.data):
+        field, fmt = "complex", "%d %d %.17g %.17g"
+    with outputManifest.openOutput(fn, "w") as f:
+        f.write("%%MatrixMarket matrix coordinate " + field + " general\n")
+        f.write("{} {} {}\n".format(r.shape[0], r.shape[1], r.nnz))
+        for s in range(0, r.nnz, chunksize):
+            data = r.data[s : s + chunksize]
+            if field == "complex":
+                data = [data.real, data.imag]
+            else:
+                data = [data]
+            np.savetxt(
+                f,
+                np.column_stack(
+                    [
+                        r.row[s : s + chunksize] + 1,
+                        r.col[s : s + chunksize] + 1,
+                    ]
+                    + data
+                ),
+                fmt=fmt,
+            )
+    return
+
+
+class StdinLines:
+    """
+    Annotation marker of a parameter receiving a lazy iterator over lines of STDIN
+    (or of the file given instead of the default `-`), without line endings.
+    """
+
+
+class StdinRecords(StdinLines):
+    """
+    Annotation marker of a parameter receiving a lazy iterator over records of STDIN:
+    lists of tab-separated fields, or parsed objects for JSON lines.
+    """
+
+
+def streamLines(fn: str = "-", records: bool = False) -> Iterable:
+    """
+    Lazily iterate over the lines of STDIN (`-`) or a file in constant memory. The file
+    is opened on the first item, so an unused stream costs nothing.
+
+    Parameters
+    ----------
+    fn
+        Path to the file, `-` for STDIN.
+    records
+        Split lines into tab-separated fields (or parse them if they are JSON).
+
+    Returns
+    -------
+    A generator of lines or records.
+    """
+
+    f = sys.stdin if fn == "-" else open(fn)
+    try:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not records:
+                yield line
+            elif line[:1] in ["{", "["]:
+                yield json.loads(line)
+            else:
+                yield line.split("\t")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def streamRows(
+    rows: Iterable,
+    fn: Union[None, str] = None,
+    limit: Union[None, int] = None,
+    opener: Callable = open,
+) -> int:
+    """
+    Write rows yielded by a (sync or async) generator as they arrive, so that the whole
+    result never has to be held in memory. Strings are written as lines, sequences as
+    tab-separated lines, dictionaries and data frames with a header taken from the
+    first one. Relies on duck typing, so that standalone scripts can inline it.
+
+    Parameters
+    ----------
+    rows
+        A generator or an async generator.
+    fn
+        Output file. Rows are printed if not set.
+    limit
+        Stop after this many rows (peek).
+    opener
+        Function opening the output file (e.g. hashing it while written).
+
+    Returns
+    -------
+    Number of rows written.
+    """
+
+    f = opener(fn, "w") if fn is not None else None
+    state = {"n": 0, "header": None}
+
+    def emit(row):
+        if hasattr(row, "to_csv"):
+            s = row.to_csv(sep="\t", header=state["header"] is None)
+            state["header"] = True
+        elif isinstance(row, dict):
+            s = ""
+            if state["header"] is None:
+                state["header"] = list(row.keys())
+                s += "\t".join([str(x) for x in state["header"]]) + "\n"
+            s += "\t".join([str(row.get(x, "")) for x in state["header"]]) + "\n"
+        elif isinstance(row, (list, tuple)) or hasattr(row, "tolist"):
+            if hasattr(row, "tolist"):
+                row = row.tolist()
+            s = "\t".join([str(x) for x in row]) + "\n"
+        else:
+            s = str(row)
+            if s[-1:] != "\n":
+                s += "\n"
+        if f is None:
+            print(s, end="")
+        else:
+            f.write(s)
+        state["n"] += 1
+        return limit is not None and state["n"] >= limit
+
+    async def drain():
+        async for row in rows:
+            if emit(row):
+                break
+        await rows.aclose()
+
+    try:
+        if inspect.isasyncgen(rows):
+            asyncio.run(drain())
+        else:
+            for row in rows:
+                if emit(row):
+                    break
+    finally:
+        if f is not None:
+            f.close()
+    return state["n"]
+
+
+def mapOver(*params: str, chunksize: Union[None, int] = None) -> Callable:
+    """
+    Decorator marking list parameters of a master function that `cmdConnect` should
+    split across a process pool sized to the available CPUs. The function has to
+    accept any slice of the lists and return results that can be concatenated.
+
+    Parameters
+    ----------
+    params
+        Names of the list parameters to map over (sliced in parallel if more than one).
+    chunksize
+        Number of elements passed to a single call. The lists are split evenly among
+        the workers if not set.
+
+    Returns
+    -------
+    The decorator, returning the function itself with the mapping attached.
+    """
+
+    def decorator(fun: Callable) -> Callable:
+        fun.mapOver = list(params)
+        fun.mapChunksize = chunksize
+        return fun
+
+    return decorator
+
+
+def mergeParts(parts: list):
+    """
+    Concatenate the partial results of a mapped output.
+
+    Parameters
+    ----------
+    parts
+        Values for every slice, in order.
+
+    Returns
+    -------
+    A single value of the type of the parts, or the list of parts if they cannot be merged.
+    """
+
+    first = parts[0]
+    if isinstance(first, pd.DataFrame):
+        return pd.concat(parts)
+    if isinstance(first, pd.Series):
+        return pd.concat(parts)
+    if isinstance(first, np.ndarray):
+        return np.concatenate(parts)
+    if isinstance(first, (list, tuple)):
+        merged = []
+        for r in parts:
+            merged += list(r)
+        return type(first)(merged)
+    if isinstance(first, dict):
+        merged = dict()
+        for r in parts:
+            merged.update(r)
+        return merged
+    if isinstance(first, str):
+        return "".join(parts)
+    return parts
+
+
+def chunkedFileName(
+    fn: str,
+    label: Union[int, str],
+) -> str:
+    """
+    Name of the file storing the result of a single element in a chunk.
+
+    Parameters
+    ----------
+    fn
+        The output file name set for the process.
+    label
+        Index of the element in the chunk (or `*` for a glob pattern). Indices are
+        zero-padded, so that the files sort in the order of the chunk.
+
+    Returns
+    -------
+    File name with the label inserted before the extension.
+    """
+
+    dr, bn = os.path.split(fn)
+    stem, ext = os.path.splitext(bn)
+    if isinstance(label, int):
+        label = "{:06d}".format(label)
+    return os.path.join(dr, stem + "_" + str(label) + ext)
+
+
+def inputLabels(labels: list, values: list) -> list:
+    """
+    Mix the identity of the inputs of a task into chunk labels, so that the results of
+    a parameter combination on different inputs get different file names. Files are
+    identified by their content, anything else by its string form.
+
+    Parameters
+    ----------
+    labels
+        Labels of the chunk elements (keys of parameter combinations).
+    values
+        Values of the input parameters of the task.
+
+    Returns
+    -------
+    The labels with a hash of the inputs appended.
+    """
+
+    digest = inputDigest(values)
+    return [str(label) + "_" + digest for label in labels]
+
+
+def inputDigest(values: list) -> str:
+    """
+    Hash of the inputs of a task. Files are identified by their content, anything else
+    by its string form.
+
+    Parameters
+    ----------
+    values
+        Values of the input parameters of the task.
+
+    Returns
+    -------
+    Hex digest of the inputs.
+    """
+
+    h = hashlib.blake2b(digest_size=8)
+    for v in values:
+        for x in v if isinstance(v, list) else [v]:
+            if isinstance(x, str) and os.path.isfile(x):
+                with open(x, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        h.update(block)
+            else:
+                h.update(str(x).encode())
+            h.update(b"\0")
+    return h.hexdigest()
+
+
 def startScriptConneted(
     dr: str,
+    zipped: bool = False,
 ) -> str:
     """
     Adds a heading to autogenerated scripts with shebang and import of introSpect.
@@ -738,21 +1857,26 @@ def startScriptConneted(
     ----------
     dr
         The directory where to develompental packages live.
+    zipped
+        If packages are (also) shipped as a zip next to the directory.
 
     Returns
     -------
     A heading for scripts (in Nextflow bin).
     """
 
+    paths = "    sys.path.append('" + dr + "')\n"
+    if zipped:
+        paths = "    sys.path.append('" + dr + ".zip')\n" + paths
     connected = (
         """
     #!/usr/bin/env python
     # -*- coding: utf-8 -*-
 
     import sys
-    sys.path.append('"""
-        + dr
-        + """')
+"""
+        + paths
+        + """
 
     import introSpect
     """
@@ -763,6 +1887,11 @@ def startScriptConneted(
 def endScriptConneted(
     f: Callable,
     modified_kws: str,
+    chunked: Union[None, list] = None,
+    chunk_workers: Union[None, int] = None,
+    mapped: Union[None, list] = None,
+    cached: Union[None, bool, list] = None,
+    manifest: bool = False,
 ) -> str:
     """
     Adds a footer to autogenerated scripts with a `main` function accessible to
@@ -775,12 +1904,31 @@ def endScriptConneted(
     modified_kws
         Command line arguments that are not autogenreated from the function, but added
         manually. Typically those controlling execution (verbose) and output (file name).
+    chunked
+        Parameters receiving a chunk of channel items; the function is mapped over them.
+    chunk_workers
+        Size of the process pool mapping the function over a chunk.
+    mapped
+        List parameters split across a process pool inside a single call.
+    cached
+        Parameters loaded through the node-local cache (True for all of them).
+    manifest
+        Write a manifest with checksums next to every output.
 
     Returns
     -------
     A footer for scripts (in Nextflow bin).
     """
 
+    extras = ""
+    if chunked not in [None, []]:
+        extras += ", chunked=" + str(chunked)
+        if chunk_workers is not None:
+            extras += ", chunk_workers=" + str(chunk_workers)
+    if mapped not in [None, []]:
+        extras += ", mapped=" + str(mapped)
+    if cached not in [None, False, []]:
+        extras += ", cached=" + str(cached)
     connected = (
         """
     def main():
@@ -788,9 +1936,13 @@ def endScriptConneted(
         + f
         + """, """
         + str(modified_kws)
+        + extras
+        + """)
+        with introSpect.commandLines.cancellable():
+            mainFunction.eval()
+            mainFunction.save(report=True"""
+        + (", manifest=True" if manifest else "")
         + """)
-        mainFunction.eval()
-        mainFunction.save()
         return
 
     if __name__ == '__main__':
@@ -800,6 +1952,326 @@ def endScriptConneted(
     return textwrap.dedent(connected)
 
 
+def startScriptStandalone() -> str:
+    """
+    Adds a heading to standalone autogenerated scripts: shebang and the imports of the
+    inlined command line interface only, introSpect itself is not imported.
+
+    Returns
+    -------
+    A heading for scripts (in Nextflow bin).
+    """
+
+    connected = """
+    #!/usr/bin/env python
+    # -*- coding: utf-8 -*-
+
+    import os, argparse, json, hashlib, asyncio, inspect
+    from typing import Union, Callable, Iterable
+    """
+    return connected[1:]
+
+
+def endScriptStandalone(
+    f: Callable,
+    modified_kws: dict,
+    chunked: Union[None, list] = None,
+) -> str:
+    """
+    Adds a footer to standalone autogenerated scripts. The argparse setup `cmdConnect`
+    would derive at runtime is precomputed and inlined, together with a trimmed writer.
+
+    Parameters
+    ----------
+    f
+        The most important function in the script that gets wrapped in `main` and exposed.
+    modified_kws
+        Command line arguments that are not autogenreated from the function, but added
+        manually. Typically those controlling execution (verbose) and output (file name).
+    chunked
+        Parameters receiving a chunk of channel items; the function is mapped over them.
+
+    Returns
+    -------
+    A footer for scripts (in Nextflow bin).
+    """
+
+    cmd = cmdConnect(f, modified_kws, chunked=chunked)
+    blockers = standaloneBlockers(cmd)
+    if len(blockers) > 0:
+        raise ValueError(
+            f.__name__
+            + " has parameters "
+            + ", ".join(blockers)
+            + "; it cannot run standalone!!!"
+        )
+    positional = [p for p in cmd.params if p in cmd.spect.args and p != "self"]
+    keywords = [p for p in cmd.params if p not in cmd.spect.args]
+    outputs = [r[0] for r in cmd.results]
+    if chunked is None:
+        chunked = []
+
+    connected = "\n\n"
+    for helper in [
+        cmdConnect.ExtendAction,
+        cmdConnect.stringSplitter,
+        cmdConnect.intSplitter,
+        cmdConnect.floatSplitter,
+        chunkedFileName,
+        inputLabels,
+        awaitResult,
+        streamRows,
+        writeMinimal,
+        runStandalone,
+    ]:
+        source = textwrap.dedent(inspect.getsource(helper))
+        source = source.replace("@staticmethod\n", "")
+        connected += source + "\n\n"
+    connected += (
+        "def buildParser():\n"
+        + "    parser = argparse.ArgumentParser(\n"
+        + "        description="
+        + repr(cmd.doc["description"])
+        + ",\n"
+        + "        formatter_class=argparse.RawTextHelpFormatter,\n"
+        + '        fromfile_prefix_chars="@",\n'
+        + "    )\n"
+        + '    parser.register("action", "exappend", ExtendAction)\n'
+    )
+    for line in standaloneArguments(cmd):
+        connected += "    " + line + "\n"
+    connected += "    return parser\n\n\n"
+    connected += textwrap.dedent(
+        """
+    def main():
+        runStandalone("""
+        + f.__name__
+        + ", buildParser(), "
+        + str(positional)
+        + ", "
+        + str(keywords)
+        + ", "
+        + str(outputs)
+        + ", "
+        + str(chunked)
+        + """)
+        return
+
+    if __name__ == '__main__':
+        main()
+    """
+    )
+    return connected
+
+
+def standaloneBlockers(
+    cmd: cmdConnect,
+    cached: Union[None, bool, list] = None,
+    manifest: bool = False,
+) -> list:
+    """
+    Features of a master function that need introSpect at runtime, so that its script
+    cannot be standalone.
+
+    Parameters
+    ----------
+    cmd
+        Command line interface of the function.
+    cached
+        Annotated inputs parsed through the node-local cache (list or True for all).
+    manifest
+        If checksummed manifests are written next to the outputs.
+
+    Returns
+    -------
+    Descriptions of the features found (empty if the script can be standalone).
+    """
+
+    blockers = []
+    if len(cmd.mapped) > 0:
+        blockers.append("mapped over a process pool")
+    if len(cmd.checkpointed) > 0:
+        blockers.append("receiving checkpoints")
+    if len(cmd.streamed) > 0:
+        blockers.append("streamed from STDIN")
+    if len(cmd.loaded) > 0:
+        blockers.append("loaded lazily from files")
+    if cached not in [None, False, []]:
+        blockers.append("cached on the node")
+    if manifest:
+        blockers.append("written with a manifest")
+    return blockers
+
+
+def standaloneArguments(cmd: cmdConnect) -> list:
+    """
+    Render the arguments of a command line interface as `add_argument` calls.
+
+    Parameters
+    ----------
+    cmd
+        The command line interface of the master function.
+
+    Returns
+    -------
+    Lines of code adding the arguments to `parser`.
+    """
+
+    actions = {
+        argparse._StoreAction: None,
+        argparse._StoreTrueAction: "store_true",
+        argparse._StoreFalseAction: "store_false",
+        argparse._StoreConstAction: "store_const",
+        argparse._AppendAction: "append",
+        cmdConnect.ExtendAction: "exappend",
+        cmdConnect.ArrayExtendAction: "exappend",
+    }
+    lines = []
+    for a in cmd.cmd_args._actions:
+        if isinstance(a, (argparse._HelpAction, argparse._VersionAction)):
+            continue
+        if a.dest in ["self", "displayMax"]:
+            continue
+        if type(a) not in actions:
+            raise ValueError(
+                "Argument " + a.dest + " cannot be inlined into a standalone script!!!"
+            )
+        action = actions[type(a)]
+        if len(a.option_strings) > 0:
+            args = [repr(x) for x in a.option_strings]
+            args.append("dest=" + repr(a.dest))
+        else:
+            args = [repr(a.dest)]
+        if action is not None:
+            args.append("action=" + repr(action))
+        if action in ["store_const"]:
+            args.append("const=" + repr(a.const))
+        if action not in ["store_true", "store_false", "store_const"]:
+            if a.nargs is not None:
+                args.append("nargs=" + repr(a.nargs))
+            if a.type is not None:
+                if a.type in [int, float, str]:
+                    args.append("type=" + a.type.__name__)
+                elif a.type in [cmd.intSplitter, cmd.intArraySplitter]:
+                    args.append("type=intSplitter")
+                elif a.type in [cmd.floatSplitter, cmd.floatArraySplitter]:
+                    args.append("type=floatSplitter")
+                elif a.type == cmd.stringSplitter:
+                    args.append("type=stringSplitter")
+                else:
+                    raise ValueError(
+                        "Type of "
+                        + a.dest
+                        + " cannot be inlined into a standalone script!!!"
+                    )
+        if a.default is not None and action not in ["store_true", "store_false"]:
+            args.append("default=" + repr(a.default))
+        if a.help not in [None, ""]:
+            args.append("help=" + repr(a.help))
+        lines.append("parser.add_argument(" + ", ".join(args) + ")")
+    return lines
+
+
+def writeMinimal(r, fn=None) -> None:
+    """
+    Trimmed result writer of standalone scripts. Relies on duck typing, so that it does
+    not need pandas or matplotlib to be imported.
+    """
+
+    if inspect.isgenerator(r) or inspect.isasyncgen(r):
+        streamRows(r, fn)
+        return
+    if fn is None:
+        print(r)
+        return
+    if hasattr(r, "to_csv"):
+        r.to_csv(fn, sep="\t")
+        return
+    if hasattr(r, "savefig") or hasattr(r, "get_figure"):
+        getattr(r, "figure", r).savefig(fn)
+        return
+    if fn[-5:] == ".json":
+        with open(fn, "w") as f:
+            json.dump(r, f)
+        return
+    if hasattr(r, "tolist"):
+        r = r.tolist()
+    if isinstance(r, str):
+        s = r
+    elif isinstance(r, dict):
+        s = ""
+        for k, v in r.items():
+            if isinstance(v, (list, tuple, set)):
+                v = "\t".join([str(x) for x in v])
+            s += str(k) + "\t" + str(v) + "\n"
+    elif isinstance(r, (list, tuple, set)):
+        s = ""
+        for e in r:
+            if isinstance(e, (list, tuple)):
+                e = "\t".join([str(x) for x in e])
+            s += str(e) + "\n"
+    else:
+        s = str(r)
+    with open(fn, "w") as f:
+        f.write(s)
+    return
+
+
+def runStandalone(
+    fun: Callable,
+    parser: argparse.ArgumentParser,
+    positional: list,
+    keywords: list,
+    outputs: list,
+    chunked: list,
+) -> None:
+    """
+    Parse the command line, call the master function and write its results; the
+    standalone counterpart of `cmdConnect.eval` and `cmdConnect.save`.
+    """
+
+    args, rest = parser.parse_known_args()
+    for fn in getattr(args, "argsJson", None) or []:
+        with open(fn) as f:
+            for k, v in json.load(f).items():
+                setattr(args, k, v)
+    a = [getattr(args, p) for p in positional]
+    kw = dict([(p, getattr(args, p)) for p in keywords])
+    calls = [(None, a, kw)]
+    if len(chunked) > 0:
+        calls = []
+        chunks = dict([(p, getattr(args, p) or []) for p in chunked])
+        labels = getattr(args, "chunkLabels", None)
+        labelled = getattr(args, "chunkLabelInputs", None) or []
+        n = min([len(c) for c in chunks.values()])
+        if labels is None or len(labels) < n:
+            labels = list(range(n))
+        elif len(labelled) > 0:
+            labels = inputLabels(labels, [getattr(args, p, None) for p in labelled])
+        for j in range(n):
+            calls.append(
+                (
+                    labels[j],
+                    [chunks[p][j] if p in chunks else v for p, v in zip(positional, a)],
+                    dict([(p, chunks[p][j] if p in chunks else v) for p, v in kw.items()]),
+                )
+            )
+    for label, a, kw in calls:
+        rs = awaitResult(fun(*a, *rest, **kw))
+        if rs is None:
+            continue
+        if len(outputs) < 2:
+            rs = [rs]
+        for o, r in zip(outputs, rs):
+            fn = None
+            if o is not None:
+                fn = getattr(args, o)
+            if fn is not None and label is not None:
+                fn = chunkedFileName(fn, label)
+            writeMinimal(r, fn)
+    return
+
+
 def saveToScript(process, fn, dr, dependencies, modified_kws={}):
     l_imports = dependencies["imports"]
     l_packages = dependencies["inhouse_packages"]
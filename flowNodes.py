@@ -1,9 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import os, subprocess, inspect, textwrap, shutil
+import os, subprocess, inspect, textwrap, shutil, itertools, hashlib, json
+import compileall, py_compile, zipfile
 from typing import Union, Tuple, Callable
-from . import commandLines, captureIntoNotebook, hint
+from . import commandLines, captureIntoNotebook, checkpoints, hint
+
+paramsFile = "params.json"  # Lists and dicts of the pipeline, passed with -params-file
+publishModes = ["symlink", "rellink", "link", "copy", "copyNoFollow", "move"]
+cacheModes = [True, False, "lenient", "deep"]
+stageInModes = ["symlink", "rellink", "link", "copy"]
+stageOutModes = ["copy", "move", "rsync"]
 
 
 class nextflowProcess:
@@ -38,6 +45,24 @@ class nextflowProcess:
         },
         manualDoc=None,
         node_params=None,
+        chunk_size=None,
+        chunk_workers=None,
+        chunk_channels=None,
+        sweep=None,
+        sweep_batch=1,
+        sweep_cache=None,
+        standalone=False,
+        pin_threads=True,
+        map_over=None,
+        cache_inputs=None,
+        stage_params_above=1000,
+        manifest=False,
+        checkpoint_dir="${workflow.workDir}/checkpoints",
+        retry_cancelled=None,
+        error_strategy="ignore",
+        scratch=None,
+        stage_in_mode=None,
+        stage_out_mode=None,
     ):
         self.processname = self.__class__.__name__
         self.command = command
@@ -70,12 +95,53 @@ class nextflowProcess:
         if node_params is None:
             node_params = dict()
         self.node_params = node_params
+        self.chunk_size = chunk_size  # Number of channel items processed by a single task
+        self.chunk_workers = (
+            chunk_workers  # Size of the in-task process pool mapping over a chunk
+        )
+        self.chunk_channels = chunk_channels  # Input channels to chunk (all if None)
+        if sweep is None:
+            sweep = dict()
+        self.sweep = sweep  # Lists or ranges of values per parameter for a grid search
+        self.sweep_batch = sweep_batch  # Number of combinations computed by one task
+        self.sweep_cache = (
+            sweep_cache  # Results of combinations are published to and reused from here
+        )
+        self.standalone = standalone  # Inline the command line interface into the script (if nothing needs introSpect)
+        self.pin_threads = (
+            pin_threads  # Limit BLAS/OpenMP and in-task pools to the CPUs of the task
+        )
+        self.map_over = map_over  # List parameters split across a process pool in a task
+        self.cache_inputs = (
+            cache_inputs  # Annotated inputs parsed once per node (list or True for all)
+        )
+        self.stage_params_above = (
+            stage_params_above  # Lists and dicts longer than this (as JSON) go in a file
+        )
+        self.location = None
+        self.manifest = manifest  # Write checksummed manifests next to the outputs
+        self.checkpoint_dir = (
+            checkpoint_dir  # Checkpoints of tasks are kept here across retries
+        )
+        self.checkpointed = []
+        self.retry_cancelled = (
+            retry_cancelled  # Times to requeue a task killed by the scheduler (exit 75)
+        )
+        self.error_strategy = (
+            error_strategy  # What other failures do when cancelled tasks are retried
+        )
+        self.scratch = scratch  # Run tasks in a node-local folder (True, path or 'ram-disk')
+        self.stage_in_mode = stage_in_mode  # How inputs get into the task (symlink, copy...)
+        self.stage_out_mode = stage_out_mode  # How outputs get back (copy, move, rsync)
         self.capture = capture  # Converts the process into markdown of a notebook (easily modify plots)
         self.capturepars = capturepars
         self.cmdpars = None
         self.cmdouts = None
         self.cmdpreset = dict()
         self.addedparams = []
+        self.sweep_cached = dict()
+        self.pipeline_params = dict()  # Parameters of the pipeline, set by channelNodes
+        self.node_defaults = dict()  # Defaults of node_params for the pipeline, set by channelNodes
         self.command_locally = True
         self.customize_features()
 
@@ -109,11 +175,243 @@ class nextflowProcess:
     def customize_features(self):
         return None
 
+    def chunked_channel(self, k):
+        """
+        Check if items of an input channel are collated into chunks for a single task.
+        """
+        if self.chunk_size is None or k in self.outchannels:
+            return False
+        if self.chunk_channels is None:
+            return True
+        return k in self.chunk_channels
+
+    def chunked_outputs(self):
+        """
+        Check if output files are written per chunk element (and flattened into the channel).
+        """
+        return self.chunk_size is not None or len(self.sweep) > 0
+
+    def chunked_parameters(self):
+        """
+        Python variables receiving a chunk (list) of channel items instead of one item.
+        """
+        chunked = list(self.sweep.keys())
+        if self.chunk_size is None or self.inputs is not None:
+            return chunked
+        for k, v in self.channel_specifications().items():
+            if v[0] is None or not self.chunked_channel(k):
+                continue
+            if type(v[2]) is not tuple:
+                pyVariable = (v[2],)
+            else:
+                pyVariable = v[2]
+            for e in pyVariable:
+                if e not in [None, "None", ""] and e[0] != "*":
+                    chunked.append(e)
+        return chunked
+
+    def chunked_variables(self):
+        """
+        Nextflow variables holding a chunk (list) of channel items in a task.
+        """
+        variables = []
+        if self.chunk_size is None or self.inputs is not None:
+            return variables
+        for k, v in self.channel_specifications().items():
+            if v[0] is None or not self.chunked_channel(k):
+                continue
+            if type(v[1]) is tuple:
+                variables += list(v[1])
+            else:
+                variables += v[1].split(", ")
+        return variables
+
+    def sweep_inputs(self):
+        """
+        Queue input channels of a swept node (items only known when the task runs)
+        with their Python variables, and values of inputs read from pipeline parameters.
+        """
+        queued, variables, fixed = [], [], dict()
+        for k, v in self.channel_specifications().items():
+            if v[0] is None or k not in self.inchannels:
+                continue
+            if v[4]:
+                fixed[k] = self.pipeline_params.get(k)
+                continue
+            queued.append(k)
+            pyVariable = v[2] if type(v[2]) is tuple else (v[2],)
+            for e in pyVariable:
+                if e not in [None, "None", ""] and e[0] != "*":
+                    variables.append(e)
+        return queued, variables, fixed
+
+    def sweep_context(self):
+        """
+        Everything besides the swept values that determines the results: the process
+        and the source of its code, the resolved parameters and the inputs read from
+        pipeline parameters.
+        """
+        params = dict()
+        for k, v in self.params.items():
+            if k in self.sweep or str(k).startswith(self.processname + "_"):
+                continue
+            params[str(k)] = self.pipeline_params.get(k, v)
+        code = hashlib.blake2b(digest_size=8)
+        code.update(str(self.command).encode())
+        helpers = self.dependencies().get("helpers", [])
+        for f in [self.process] + list(helpers):
+            code.update(inspect.getsource(f).encode())
+        return {
+            "process": self.processname,
+            "code": code.hexdigest(),
+            "params": parameterIdentity(params),
+            "inputs": parameterIdentity(self.sweep_inputs()[2]),
+        }
+
+    def sweep_combinations(self):
+        """
+        Combinations of swept parameter values whose results are not in the cache yet,
+        and the cached result files per output channel. Results of nodes with queue
+        inputs depend on the items, so they are not looked up at compile time.
+        """
+        combinations, cached = [], dict()
+        context = self.sweep_context()
+        lookup = len(self.sweep_inputs()[0]) == 0
+        outfiles = dict()
+        for k, v in self.channel_specifications().items():
+            if k in self.outchannels and v[0] == "file" and type(v[1]) is not tuple:
+                if v[1][0] in ["'", '"']:
+                    outfiles[k] = v[1][1:-1]
+        for k in outfiles:
+            cached[k] = []
+        for combination in expandSweep(self.sweep):
+            key = sweepKey(combination, context)
+            if self.sweep_cache is not None and len(outfiles) > 0 and lookup:
+                found = dict()
+                for k, fn in outfiles.items():
+                    fn = self.sweep_cache + "/" + commandLines.chunkedFileName(fn, key)
+                    if os.path.isfile(fn):
+                        found[k] = os.path.realpath(fn)
+                if len(found) == len(outfiles):
+                    for k, fn in found.items():
+                        cached[k].append(fn)
+                    continue
+            combinations.append([key] + [combination[p] for p in self.sweep])
+        return combinations, cached
+
+    def compile_pretreat(self):
+        pretreat = list(self.channel_pretreat())
+        if len(self.sweep) > 0 and len(self.sweep_inputs()[0]) == 0:
+            pretreat.append(
+                [
+                    "Channel",
+                    "fromList(params." + self.processname + "_sweep)",
+                    "collate(" + str(self.sweep_batch) + ")",
+                    "set{" + self.processname + "_sweep}",
+                ]
+            )
+        return pretreat
+
+    def compile_posttreat(self):
+        posttreat = ""
+        if len(self.sweep) > 0 and self.sweep_cache is not None:
+            for i, k in enumerate(self.sweep_cached):
+                if type(k) is tuple:
+                    target = "into{" + "; ".join(k) + "}"
+                else:
+                    target = "set{" + k + "}"
+                posttreat += (
+                    sweptChannelName(k)
+                    + "\n    .mix(Channel.fromList(params."
+                    + self.processname
+                    + "_cached_"
+                    + str(i)
+                    + ").map{ file(it) })\n    ."
+                    + target
+                    + "\n"
+                )
+        return posttreat
+
+    def storage_directives(self):
+        """
+        Directives controlling where results are kept, declared in `node_params`:
+            publishDir      folder the outputs are published to
+            publishMode     how they are published (symlink, link, copy...), copy by default
+            storeDir        permanent folder of the outputs; tasks finding them are skipped
+            cache           task caching (True, False, 'lenient' for shared filesystems, 'deep')
+        Defaults of the pipeline (`nodeDefaults` of `channelNodes`) apply to keys the
+        node does not set. Swept nodes also publish (copy) to their sweep cache.
+        """
+
+        node_params = {**self.node_defaults, **self.node_params}
+        lines = []
+        mode = node_params.get("publishMode", "copy")
+        if mode not in publishModes:
+            raise ValueError(
+                "Publish mode "
+                + str(mode)
+                + " is not one of "
+                + ", ".join(publishModes)
+                + "!!!"
+            )
+        publish = [(node_params.get("publishDir"), mode)]
+        if len(self.sweep) > 0:
+            publish.append((self.sweep_cache, "copy"))  # Has to outlive the work folder
+        for dr, m in publish:
+            if dr is not None:
+                lines.append(("publishDir", groovyString(dr) + ", mode: '" + m + "'"))
+        if node_params.get("storeDir") is not None:
+            lines.append(("storeDir", groovyString(node_params["storeDir"])))
+        cache = node_params.get("cache")
+        if cache is not None:
+            if cache not in cacheModes:
+                raise ValueError("Cache mode " + str(cache) + " is not supported!!!")
+            if isinstance(cache, bool):
+                lines.append(("cache", str(cache).lower()))
+            else:
+                lines.append(("cache", "'" + cache + "'"))
+        return lines
+
+    def staging_settings(self):
+        """
+        Staging options of the process for its `withName` block in `nextflow.config`,
+        also followed by the local executor.
+        """
+
+        settings = dict()
+        if self.scratch not in [None, False]:
+            settings["scratch"] = self.scratch
+        for k, v, modes in [
+            ("stageInMode", self.stage_in_mode, stageInModes),
+            ("stageOutMode", self.stage_out_mode, stageOutModes),
+        ]:
+            if v is None:
+                continue
+            if v not in modes:
+                raise ValueError(
+                    k + " " + str(v) + " is not one of " + ", ".join(modes) + "!!!"
+                )
+            settings[k] = v
+        return settings
+
     def compile_directives(self):
         directives = self.directives()
         dirs = "\n"
         if self.conda not in [None, ""]:
             directives["conda"] = self.conda
+        for k, v in self.storage_directives():
+            if k == "publishDir" or k not in directives:
+                dirs += k + " " + v + "\n"  # A process can publish to several folders
+        if self.retry_cancelled not in [None, 0]:
+            directives.setdefault(
+                "errorStrategy",
+                "{ task.exitStatus == "
+                + str(commandLines.cancelledExit)
+                + " ? 'retry' : '"
+                + self.error_strategy
+                + "' }",
+            )
+            directives.setdefault("maxRetries", str(self.retry_cancelled))
         for k, v in directives.items():
             dirs += k + " " + v + "\n"
         return textwrap.indent(dirs, "            ")
@@ -177,9 +475,12 @@ class nextflowProcess:
                             pyVariable = (v[2],)
                         else:
                             pyVariable = v[2]
+                        chunked = self.chunked_channel(k)
                         for i in range(len(pyVariable)):
                             cd = channelVariables[i]
+                            isFile = v[0] == "file"
                             if cd[:5] == "file(":
+                                isFile = True
                                 cd = cd.replace("file(", "")
                                 cd = cd[:-1]
                             if cd[0] in ["'", '"', "\n"]:
@@ -190,7 +491,10 @@ class nextflowProcess:
                                     cd = cd.replace('"', "")
                                     cd = " " + cd
                             else:
-                                cd = "$" + cd
+                                if chunked and not isFile:
+                                    cd = "${" + cd + ".join(',')}"
+                                else:
+                                    cd = "$" + cd
                             e = pyVariable[i]
                             if e not in [None, "None"]:
                                 remainder.pop(e, None)
@@ -224,6 +528,10 @@ class nextflowProcess:
                             channelTransform = ""
                         else:
                             channelTransform = v[3]
+                        if chunked:
+                            channelTransform += ".collate(" + str(self.chunk_size) + ")"
+                            if len(channelVariables) > 1:
+                                channelTransform += ".map{ c -> c.transpose() }"
                         inputs += (
                             v[0]
                             + " "
@@ -232,7 +540,55 @@ class nextflowProcess:
                             + channelTransform
                             + "\n"
                         )
+            if len(self.sweep) > 0:
+                combinations, self.sweep_cached = self.sweep_combinations()
+                queued, labelled, fixed = self.sweep_inputs()
+                if len(queued) > 0:
+                    # Every batch of the grid runs on every item of the queue inputs
+                    combinations = [
+                        combinations[i : i + self.sweep_batch]
+                        for i in range(0, len(combinations), self.sweep_batch)
+                    ]
+                    inputs += (
+                        "each sweep_combinations from params."
+                        + self.processname
+                        + "_sweep\n"
+                    )
+                    if len(labelled) > 0:
+                        flags.append("--chunkLabelInputs " + ",".join(labelled))
+                else:
+                    inputs += (
+                        "val sweep_combinations from " + self.processname + "_sweep\n"
+                    )
+                self.params[self.processname + "_sweep"] = combinations
+                self.addedparams.append(self.processname + "_sweep")
+                for i, k in enumerate(self.sweep_cached):
+                    self.params[
+                        self.processname + "_cached_" + str(i)
+                    ] = self.sweep_cached[k]
+                    self.addedparams.append(self.processname + "_cached_" + str(i))
+                flags.append(
+                    "--chunkLabels ${sweep_combinations.collect{ it[0] }.join(',')}"
+                )
+                for i, k in enumerate(self.sweep):
+                    remainder.pop(k, None)
+                    cd = (
+                        "'${sweep_combinations.collect{ it["
+                        + str(i + 1)
+                        + "] }.join(',')}'"
+                    )
+                    cm = self.cmdpars.get(k, "--" + k + " ")
+                    if cm == "":
+                        positionals[k] = cd
+                    else:
+                        flags.append(cm + cd)
+            staged = dict()
             for k, v in remainder.items():
+                if v is None and self.cmdpars.get(k, "--") != "":
+                    continue  # The default of the function applies
+                if self.staged_parameter(k, v):
+                    staged[k] = v
+                    continue
                 inputs += "val " + k + " from params." + k + "\n"
                 self.addedparams.append(k)
                 if k in self.cmdpars:
@@ -243,12 +599,41 @@ class nextflowProcess:
                         flags.append(cm + "$" + k)
                 else:
                     flags.append("--" + k + " $" + k)
+            if len(staged) > 0:
+                k = self.stage_parameters(staged)
+                inputs += "file " + k + " from file(params." + k + ")\n"
+                flags.append("--args-json $" + k)
             self.flags, self.positionals, self.lazy = flags, positionals, lazy
         else:
             for e in self.inputs:
                 inputs += e + "\n"
         return textwrap.indent(inputs, "                ")
 
+    def staged_parameter(self, k, v):
+        """
+        Check if a parameter is too long for the command line and goes into the JSON file.
+        """
+        if self.stage_params_above is None or self.location is None:
+            return False
+        if self.cmdpars.get(k, "--") == "":
+            return False  # Positional arguments cannot be left out of the command
+        if not isinstance(v, (list, tuple, dict)):
+            return False
+        return len(json.dumps(v, default=str)) > self.stage_params_above
+
+    def stage_parameters(self, staged):
+        """
+        Write staged parameters into a JSON file passed to the script with `--args-json`.
+        """
+        k = self.processname + "_args"
+        fn = os.path.abspath(self.location + "/params/" + k + ".json")
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        with open(fn, "w") as f:
+            json.dump(staged, f, default=str)
+        self.params[k] = fn
+        self.addedparams.append(k)
+        return k
+
     def compile_outputs(self):
         out = "\n"
         if self.outputs is None:
@@ -311,6 +696,23 @@ class nextflowProcess:
                         channelTransform = ""
                     else:
                         channelTransform = v[3]
+                    if len(self.sweep) > 0 and self.sweep_cache is not None:
+                        if k in self.sweep_cached:
+                            channelName = " into " + sweptChannelName(k)
+                    if self.chunked_outputs() and v[0] == "file":
+                        if channelVariable[0] in ["'", '"']:
+                            channelVariable = (
+                                '"'
+                                + commandLines.chunkedFileName(
+                                    channelVariable[1:-1], "*"
+                                )
+                                + '"'
+                            )
+                            channelTransform = " mode flatten" + channelTransform
+                    if v[0] == "val" and self.chunk_size is not None:
+                        chunkedVariables = self.chunked_variables()
+                        if all([e in chunkedVariables for e in channelVariables]):
+                            channelTransform = " mode flatten" + channelTransform
                     out += (
                         v[0]
                         + " "
@@ -319,6 +721,17 @@ class nextflowProcess:
                         + channelTransform
                         + "\n"
                     )
+                    if self.manifest and v[0] == "file":
+                        if self.chunked_outputs():
+                            channelVariables = [channelVariable]
+                        for j, cd in enumerate(channelVariables):
+                            out += (
+                                'file "'
+                                + manifestFileName(cd)
+                                + '" optional true into '
+                                + manifestChannelName(k, j)
+                                + "\n"
+                            )
             for k, v in remainder.items():
                 out += "val " + k + " into " + k + "\n"
                 if k in self.cmdpars:
@@ -334,10 +747,11 @@ class nextflowProcess:
                 out += e + "\n"
         return textwrap.indent(out, "                ")
 
-    def compile_process(self, dr):
+    def compile_process(self, dr, zip_packages=False):
         if self.command is None:
             script_name = self.processname + ".py"
             script_file = dr + "/bin/" + script_name
+            self.location = dr
             arguments = commandLines.cmdConnect(self.process, self.modified_kws)
             self.cmdpars = arguments.argreverse
             self.cmdpars.pop("self", None)
@@ -346,10 +760,13 @@ class nextflowProcess:
             if self.cmdpreset is None:
                 self.cmdpreset = dict()
             self.cmdorder = arguments.spect.args
+            self.checkpointed = arguments.checkpointed
+            for p in self.checkpointed:
+                self.cmdpars.pop(p, None)  # The handle is set up by the command
             for v, t in arguments.results:
                 if v in self.cmdpars:
                     self.cmdouts[v] = self.cmdpars.pop(v)
-            conda = self.generate_py(script_file, dr)
+            conda = self.generate_py(script_file, dr, zip_packages=zip_packages)
             os.chmod(script_file, 0o775)
             if self.manualDoc in [None, ""]:
                 if self.process.__doc__ is None:
@@ -399,6 +816,29 @@ class nextflowProcess:
                 + " "
                 + command
             )
+        if len(self.checkpointed) > 0:  # Reused by later runs, dropped if inputs differ
+            stable = (
+                self.checkpoint_dir + "/" + self.processname + "/${task.index}"
+            )
+            command = (
+                "mkdir -p "
+                + stable
+                + "\n            ln -sfn "
+                + stable
+                + " .checkpoint"
+                + "\n            export "
+                + checkpoints.checkpointVariable
+                + "=.checkpoint"
+                + "\n            "
+                + command
+            )
+        if self.pin_threads:
+            command = (
+                "export "
+                + " ".join([e + "=${task.cpus}" for e in commandLines.threadVariables])
+                + "\n            "
+                + command
+            )
         return command
 
     def check_container(self, containers, dr):
@@ -433,7 +873,7 @@ class nextflowProcess:
                 self.process_settings["container"] = fn
         return containers
 
-    def generate_py(self, fn, dr):
+    def generate_py(self, fn, dr, zip_packages=False):
         # TODO reuse the commandLines version
         dependencies = {
             "conda": "",
@@ -449,14 +889,43 @@ class nextflowProcess:
             dependencies["inhouse_packages"],
             dr + "/packages",
         )
-        recipe = textwrap.dedent(commandLines.startScriptConneted(dr + "/packages"))
+        # Pools, checkpoints, streams, lazy or cached inputs and manifests need introSpect
+        standalone = self.standalone
+        if standalone:
+            arguments = commandLines.cmdConnect(
+                self.process, self.modified_kws, mapped=self.map_over
+            )
+            blockers = commandLines.standaloneBlockers(
+                arguments, cached=self.cache_inputs, manifest=self.manifest
+            )
+            if len(blockers) > 0:
+                standalone = False
+        if standalone:
+            recipe = textwrap.dedent(commandLines.startScriptStandalone())
+        else:
+            recipe = textwrap.dedent(
+                commandLines.startScriptConneted(
+                    dr + "/packages", zipped=zip_packages
+                )
+            )
         recipe += "\n" + "\n".join(dependencies["imports"]) + "\n\n"
         recipe += textwrap.dedent(inspect.getsource(self.process).replace("self,", ""))
         for helper_fun in dependencies["helpers"]:
             recipe += "\n" + textwrap.dedent(inspect.getsource(helper_fun)) + "\n"
-        recipe += commandLines.endScriptConneted(
-            self.process.__name__, self.modified_kws
-        )
+        if standalone:
+            recipe += commandLines.endScriptStandalone(
+                self.process, self.modified_kws, chunked=self.chunked_parameters()
+            )
+        else:
+            recipe += commandLines.endScriptConneted(
+                self.process.__name__,
+                self.modified_kws,
+                chunked=self.chunked_parameters(),
+                chunk_workers=self.chunk_workers,
+                mapped=self.map_over,
+                cached=self.cache_inputs,
+                manifest=self.manifest,
+            )
         with open(fn, "w") as f:
             f.write(recipe)
         return dependencies["conda"]
@@ -473,7 +942,7 @@ class nextflowProcess:
         """
             + textwrap.dedent(
                 "\n        ".join(
-                    ["\n            .".join(x) for x in self.channel_pretreat()]
+                    ["\n            .".join(x) for x in self.compile_pretreat()]
                 )
                 + "\n    "
             )
@@ -503,7 +972,7 @@ class nextflowProcess:
 
         """
         )
-        return textwrap.dedent(body)
+        return textwrap.dedent(body) + self.compile_posttreat()
 
 
 class helloWorld(nextflowProcess):
@@ -550,9 +1019,13 @@ def channelNodes(
     queueRestriction=None,
     generalClusterProfile=None,
     generalSettings=None,
+    executorSettings=None,
     containerPaths=None,
     labelSettings=None,
+    nodeDefaults=None,
     returnFolder=False,
+    precompile=True,
+    zip_packages=False,
     verbose=True,
 ):
     os.makedirs(location + "/bin", exist_ok=True)
@@ -574,19 +1047,16 @@ def channelNodes(
         }
         """
 
+    if executorSettings is None:
+        executorSettings = dict()
+    executorSettings = executorsByName(executorSettings)
     if queueRestriction is not None:
-        generalClusterProfile += textwrap.dedent(
-            """
-        executor {
-            $sge {
-                queueSize = """
-            + str(queueRestriction)
-            + """
-                pollInterval = '30sec'
-            }
-        }
-        """
-        )
+        sge = {"queueSize": queueRestriction, "pollInterval": "30sec"}
+        sge.update(executorSettings.get("sge", dict()))
+        executorSettings = {**executorSettings, "sge": sge}
+    generalClusterProfile = textwrap.dedent(generalClusterProfile) + executorScope(
+        executorSettings
+    )
 
     if generalSettings is None:
         generalSettings = """
@@ -602,10 +1072,14 @@ def channelNodes(
         containerPaths = dict()
     if labelSettings is None:
         labelSettings = dict()
+    if nodeDefaults is None:
+        nodeDefaults = dict()
 
     with open(location + "/bin/captureIntoNotebook.py", "w") as f:
         capturer = inspect.getsource(captureIntoNotebook)
         capturer = capturer.split("sys.path.append")
+        if zip_packages:
+            capturer[0] += '\nsys.path.append("' + location + '/packages.zip")'
         capturer[0] += '\nsys.path.append("' + location + '/packages")\n'
         capturer = "sys.path.append".join(capturer)
         f.write(capturer)
@@ -623,43 +1097,57 @@ def channelNodes(
         args = [helloWorld(inchannels=["cheers"])]
     for process in args:
         hint(verbose, "Adding process node:", process.processname)
-        process.compile_process(location)
+        defaults = dict(nodeDefaults)
+        for k in ["publishDir", "storeDir"]:
+            if defaults.get(k) is not None:
+                defaults[k] += "/" + process.processname
+        process.node_defaults = defaults
+        process.pipeline_params = main_kws
+        process.compile_process(location, zip_packages=zip_packages)
         flowBody += process.generate_nf()
         addedparams += process.addedparams
         paramlist.update(process.params)
         containerPaths = process.check_container(containerPaths, location)
         process_settings[process.processname] = process.process_settings
-    mainparams = []
+        if len(process.staging_settings()) > 0:
+            process_settings[process.processname] = {
+                **process.staging_settings(),
+                **(process.process_settings or dict()),
+            }
+    mainparams, fileparams = [], dict()
     if main_kws is None:
         main_kws = dict()
+    pipelineparams = dict()
     for k, v in main_kws.items():
-        if isinstance(v, tuple):
-            if len(v) == 1:
-                v = v[0]
-            else:
-                v = list(v)
-        if isinstance(v, str):
-            v = "'" + v + "'"
-        if type(v) is dict:
-            v = [[q, w] for q, w in v.items()]
-        mainparams.append("params." + k + " = " + str(v))
+        pipelineparams[k] = v
     for k, v in paramlist.items():
         if type(v) is tuple:
             k, v = v
         if k not in main_kws and k in addedparams:
-            if isinstance(v, str):
-                v = "'" + v + "'"
-            if type(v) is dict:
-                v = [[q, w] for q, w in v.items()]
-            if v is None:
-                v = "'None'"
-            if type(v) is tuple:
-                if len(v) == 1:
-                    v = v[0]
-                else:
-                    v = list(v)
-            mainparams.append("params." + k + " = " + str(v))
+            pipelineparams[k] = v
+    for k, v in pipelineparams.items():
+        v = pipelineParameter(v)
+        if isinstance(v, (list, dict)):
+            fileparams[k] = v
+        else:
+            mainparams.append("params." + k + " = " + configValue(v))
+    if len(fileparams) > 0:
+        with open(location + "/" + paramsFile, "w") as f:
+            json.dump(fileparams, f, indent=1, default=str)
+        mainparams.append(
+            "// Lists and dictionaries are in "
+            + paramsFile
+            + ": nextflow run main.nf -params-file "
+            + paramsFile
+        )
+    elif os.path.isfile(location + "/" + paramsFile):
+        os.remove(location + "/" + paramsFile)
     flowBody = "#!/usr/bin/env nextflow\n\n" + date_helper + "\n\n" + flowBody
+    if zip_packages:
+        zipPackages(location + "/packages", location + "/packages.zip")
+    if precompile:
+        precompileFolder(location + "/bin")
+        precompileFolder(location + "/packages")
     with open(location + "/main.nf", "w") as f:
         f.write(flowBody)
     processSettings = "process {\n"
@@ -672,9 +1160,7 @@ def channelNodes(
         if v is not None:
             s = "    withName: " + k + " {\n"
             for q, w in v.items():
-                if isinstance(w, str):
-                    w = "'" + w + "'"
-                s += "        " + q + " = " + str(w) + "\n"
+                s += "        " + q + " = " + configValue(w) + "\n"
             processSettings += s + "    }\n"
     processSettings += "}\n"
     configBody = (
@@ -691,6 +1177,188 @@ def channelNodes(
     return
 
 
+def pipelineParameter(v):
+    """
+    Normalize a pipeline parameter: tuples of one become the value, longer ones lists,
+    dictionaries lists of key-value pairs (the way channels iterate over them).
+    """
+
+    if type(v) is tuple:
+        if len(v) == 1:
+            v = v[0]
+        else:
+            v = list(v)
+    if type(v) is dict:
+        v = [[q, w] for q, w in v.items()]
+    return v
+
+
+def configValue(v) -> str:
+    """
+    Render a Python value as a setting in `nextflow.config`.
+    """
+
+    if isinstance(v, str):
+        return "'" + v.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    if isinstance(v, bool):
+        return str(v).lower()
+    if v is None:
+        return "null"
+    return str(v)
+
+
+def executorScope(settings: dict, executor: str = "sge") -> str:
+    """
+    The `executor` scope of `nextflow.config`.
+
+    Parameters
+    ----------
+    settings
+        Executor settings (queueSize, pollInterval, submitRateLimit, queueStatInterval...)
+        of the cluster executor, or dictionaries of settings keyed by executor name.
+    executor
+        Executor the settings apply to if they are not keyed by executor name.
+
+    Returns
+    -------
+    The scope, empty if there are no settings.
+    """
+
+    if len(settings) == 0:
+        return ""
+    settings = executorsByName(settings, executor)
+    scope = "\nexecutor {\n"
+    for name, v in settings.items():
+        scope += "    $" + name + " {\n"
+        for q, w in v.items():
+            scope += "        " + q + " = " + configValue(w) + "\n"
+        scope += "    }\n"
+    return scope + "}\n"
+
+
+def executorsByName(settings: dict, executor: str = "sge") -> dict:
+    """
+    Executor settings keyed by executor name. Flat settings apply to the given executor;
+    a mix of flat settings and settings keyed by executor name is rejected.
+    """
+
+    nested = [isinstance(v, dict) for v in settings.values()]
+    if all(nested):
+        return settings
+    if any(nested):
+        raise ValueError(
+            "Executor settings are either all keyed by executor name or all flat, got "
+            + ", ".join([k for k, v in settings.items() if isinstance(v, dict)])
+            + " as executor names next to flat settings!!!"
+        )
+    return {executor: settings}
+
+
+def groovyString(s: str) -> str:
+    """
+    Quote a string for Nextflow scripts; double quotes if it interpolates variables.
+    """
+
+    if "$" in s:
+        return '"' + s + '"'
+    return "'" + s + "'"
+
+
+def expandSweep(sweep: dict) -> list:
+    """
+    Expand lists or ranges of parameter values into all combinations of a grid search.
+
+    Parameters
+    ----------
+    sweep
+        Values to try for each parameter (list, tuple or range).
+
+    Returns
+    -------
+    A list of dictionaries, one for each combination.
+    """
+
+    names = list(sweep.keys())
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*[list(sweep[k]) for k in names])
+    ]
+
+
+def sweepKey(combination: dict, context: Union[None, dict] = None) -> str:
+    """
+    A short, stable label of a parameter combination, used in result file names and
+    as the key of the sweep cache.
+
+    Parameters
+    ----------
+    combination
+        Parameter values of the combination.
+    context
+        Everything else the results depend on (process, other parameters, inputs).
+
+    Returns
+    -------
+    Hash of the combination.
+    """
+
+    s = json.dumps(
+        [sorted(combination.items()), context], default=str, sort_keys=True
+    )
+    return hashlib.md5(s.encode()).hexdigest()[:12]
+
+
+def parameterIdentity(v):
+    """
+    Parameter values with files replaced by their identity (path, size and
+    modification time), so that a changed input file changes the hash of a sweep key.
+    """
+
+    if isinstance(v, dict):
+        return dict([(str(k), parameterIdentity(w)) for k, w in v.items()])
+    if isinstance(v, (list, tuple)):
+        return [parameterIdentity(w) for w in v]
+    if isinstance(v, str) and os.path.isfile(v):
+        st = os.stat(v)
+        return [os.path.realpath(v), st.st_size, st.st_mtime_ns]
+    return v
+
+
+def sweptChannelName(k: Union[str, tuple]) -> str:
+    """
+    Name of the channel carrying newly computed sweep results, before cached ones are mixed in.
+    """
+
+    if type(k) is tuple:
+        k = "_".join(k)
+    return k + "_swept"
+
+
+def manifestFileName(variable: str) -> str:
+    """
+    Name (pattern) of the manifest written next to a file output, for the output
+    declaration of the process.
+    """
+
+    if variable.find("file(") == 0:
+        variable = variable[5:-1]
+    if variable[0] in ["'", '"']:
+        return variable[1:-1] + ".manifest.json"
+    return "${" + variable + "}.manifest.json"
+
+
+def manifestChannelName(k: Union[str, tuple], j: int = 0) -> str:
+    """
+    Name of the channel the manifests of an output are declared into.
+    """
+
+    if type(k) is tuple:
+        k = "_".join(k)
+    if j > 0:
+        k += "_" + str(j)
+    return k + "_manifest"
+
+
 def createChannelSpecification(
     channel_type: str,
     name_in_nextflow: Union[None, str] = None,
@@ -825,6 +1493,50 @@ def nonCondaCopy(
     return
 
 
+def precompileFolder(dr: str) -> bool:
+    """
+    Compile every Python file in a folder into unchecked-hash `.pyc` files, so that
+    concurrent tasks neither recompile sources nor race to write `__pycache__`.
+
+    Parameters
+    ----------
+    dr
+        The folder with scripts or packages.
+
+    Returns
+    -------
+    If compilation succeeded for every file.
+    """
+
+    return compileall.compile_dir(
+        dr,
+        quiet=1,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+
+
+def zipPackages(dr: str, fn: str) -> None:
+    """
+    Ship the copied packages as a single zip of bytecode, to be put on `sys.path`.
+    One archive means far fewer metadata lookups on a shared filesystem than a folder
+    tree of modules.
+
+    Parameters
+    ----------
+    dr
+        The folder where packages were copied (`pipeline/packages`).
+    fn
+        Path of the zip file.
+    """
+
+    with zipfile.PyZipFile(fn, "w", optimize=-1) as zf:
+        for e in sorted(os.listdir(dr)):
+            p = dr + "/" + e
+            if os.path.isfile(p + "/__init__.py") or p[-3:] == ".py":
+                zf.writepy(p)
+    return
+
+
 def cleanup(
     *,
     location: str = os.getcwd(),
@@ -905,6 +1617,7 @@ def run_pipeline(
     with_graph=True,
     runprofile="cluster",
     in_background=False,
+    params_file=paramsFile,
 ):
     """
     Run a nextflow pipeline compiled by flowNodes.
@@ -925,6 +1638,9 @@ def run_pipeline(
         The name of the profile that should be run. Use ´None´ for local run.
     in_background
         Run pipeline in background.
+    params_file
+        JSON file with the lists and dictionaries of the pipeline, passed with
+        `-params-file` if it exists.
     """
 
     crdir = os.getcwd()
@@ -932,6 +1648,8 @@ def run_pipeline(
     if needs_sge_init:
         init_sge()
     cmd = ["nextflow", "run", mainfile]
+    if params_file is not None and os.path.isfile(params_file):
+        cmd += ["-params-file", params_file]
     if with_timeline:
         cmd += ["-with-timeline", "../timeline.html"]
     if with_graph:
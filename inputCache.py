@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, glob, fcntl, shutil, hashlib, contextlib
+import numpy as np
+import pandas as pd
+from typing import Union
+from . import sharedHandoff, outputManifest
+
+cachedExtensions = [".npy", ".arrow"]  # Binary forms the cache stores parsed inputs in
+
+
+def cacheDirectory() -> str:
+    """
+    Folder of the node-local cache: `INTROSPECT_CACHE_DIR` if set, a subfolder of the
+    shared memory folder otherwise.
+
+    Returns
+    -------
+    Path to the (created) cache folder.
+    """
+
+    dr = os.environ.get("INTROSPECT_CACHE_DIR")
+    if dr in [None, ""]:
+        dr = os.path.join(sharedHandoff.sharedDirectory(), "introspect_cache")
+    os.makedirs(dr, exist_ok=True)
+    return dr
+
+
+def cacheCapacity(dr: str) -> int:
+    """
+    Size cap of the cache in bytes: `INTROSPECT_CACHE_SIZE` if set, a quarter of the
+    file system hosting the cache otherwise.
+    """
+
+    try:
+        return int(os.environ["INTROSPECT_CACHE_SIZE"])
+    except:
+        return shutil.disk_usage(dr).total // 4
+
+
+@contextlib.contextmanager
+def fileLock(fn: str):
+    """
+    Exclusive lock on a lock file, shared by all tasks running on the node.
+    """
+
+    with open(fn, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def contentHash(fn: str, dr: Union[None, str] = None) -> str:
+    """
+    Hash of the content of a file. The checksum of a matching manifest (written by
+    `save`) is used as it is; otherwise the hash is remembered in the cache keyed by
+    path, size and modification time, so that a file is only read once per node.
+
+    Parameters
+    ----------
+    fn
+        Path to the file.
+    dr
+        The cache folder.
+
+    Returns
+    -------
+    Hex digest of the content.
+    """
+
+    manifest = outputManifest.readManifest(fn)
+    if manifest is not None:
+        return manifest["checksum"]
+    if dr is None:
+        dr = cacheDirectory()
+    target = os.path.realpath(fn)
+    st = os.stat(target)
+    stamp = hashlib.md5(
+        (target + ":" + str(st.st_size) + ":" + str(st.st_mtime_ns)).encode()
+    ).hexdigest()
+    stampfile = os.path.join(dr, stamp + ".hash")
+    if os.path.isfile(stampfile):
+        with open(stampfile) as f:
+            return f.read().strip()
+    h = hashlib.blake2b(digest_size=16)
+    with open(target, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    with open(stampfile + "." + str(os.getpid()), "w") as f:
+        f.write(digest)
+    os.replace(stampfile + "." + str(os.getpid()), stampfile)
+    return digest
+
+
+def cachedInput(fn: str, tp: type) -> Union[np.ndarray, pd.DataFrame]:
+    """
+    Load an input through the node-local cache. The first task parses the file and
+    stores it in binary form under a lock, concurrent and later tasks wait for it and
+    open the binary form memory-mapped.
+
+    Parameters
+    ----------
+    fn
+        Path to the input file.
+    tp
+        Annotation of the parameter (`np.ndarray`, `MemmapArray` or `pd.DataFrame`).
+
+    Returns
+    -------
+    The loaded array or data frame.
+    """
+
+    ext = os.path.splitext(os.path.realpath(fn))[1].lower()
+    if fn == "-" or ext in cachedExtensions or tp not in sharedHandoff.sharedTypes:
+        return sharedHandoff.loadInput(fn, tp)
+    if tp is pd.DataFrame and sharedHandoff.pa is None:
+        return sharedHandoff.loadInput(fn, tp)
+    dr = cacheDirectory()
+    key = os.path.join(dr, contentHash(fn, dr) + "_" + tp.__name__)
+    with fileLock(key + ".lock"):
+        for cached in [key + e for e in cachedExtensions]:
+            try:
+                os.utime(cached)
+                return sharedHandoff.openShared(cached)
+            except FileNotFoundError:
+                pass
+        r = sharedHandoff.loadInput(fn, tp)
+        if sharedHandoff.sharedExtension(r) is None:
+            return r
+        part = sharedHandoff.writeShared(r, key + "." + str(os.getpid()))
+        cached = key + sharedHandoff.sharedExtension(r)
+        os.replace(part, cached)
+        r = sharedHandoff.openShared(cached)
+    evictCache(dr, keep=cached)
+    return r
+
+
+def evictCache(
+    dr: Union[None, str] = None,
+    capacity: Union[None, int] = None,
+    keep: Union[None, str] = None,
+) -> list:
+    """
+    Remove the least recently used entries (with their lock files and the hash stamps
+    of their content) until the cache fits into its size cap. Tasks that have an entry
+    memory-mapped keep reading it after removal.
+
+    Parameters
+    ----------
+    dr
+        The cache folder.
+    capacity
+        Size cap in bytes (see `cacheCapacity`).
+    keep
+        An entry that must not be removed (the one just written).
+
+    Returns
+    -------
+    Removed entries.
+    """
+
+    if dr is None:
+        dr = cacheDirectory()
+    if capacity is None:
+        capacity = cacheCapacity(dr)
+    removed = []
+    with fileLock(os.path.join(dr, ".evict.lock")):
+        entries = []
+        for e in cachedExtensions:
+            for fn in glob.glob(os.path.join(dr, "*_*" + e)):
+                if os.path.basename(fn).count(".") > 1:
+                    continue  # Entries still being written
+                try:
+                    st = os.stat(fn)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, fn))
+        total = sum([x[1] for x in entries])
+        for mtime, size, fn in sorted(entries):
+            if total <= capacity:
+                break
+            if fn == keep:
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(fn)
+                os.remove(os.path.splitext(fn)[0] + ".lock")
+            total -= size
+            removed.append(fn)
+
+        ### Hash stamps of contents no remaining entry refers to
+        digests = [os.path.basename(x[2]).split("_")[0] for x in entries]
+        kept = set([d for d, x in zip(digests, entries) if x[2] not in removed])
+        stale = set([os.path.basename(fn).split("_")[0] for fn in removed]) - kept
+        if len(stale) > 0:
+            for fn in glob.glob(os.path.join(dr, "*.hash")):
+                with contextlib.suppress(FileNotFoundError):
+                    with open(fn) as f:
+                        digest = f.read().strip()
+                    if digest in stale:
+                        os.remove(fn)
+    return removed
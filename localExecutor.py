@@ -0,0 +1,930 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, glob, time, json, shutil, hashlib, tempfile, subprocess, traceback
+import contextlib, concurrent.futures
+from typing import Union, Tuple
+from . import commandLines, flowNodes, sharedHandoff, checkpoints, hint
+
+
+class localChannel:
+    """
+    A channel of the local executor. Items are kept, so every consumer can read the
+    channel with its own cursor.
+    """
+
+    def __init__(self, items=None, closed=False, value=False):
+        if items is None:
+            items = []
+        self.items = items
+        self.closed = closed
+        self.value = value  # Value channels are never consumed, just read again
+
+
+class localTask:
+    """
+    A single call of a process node with one set of channel items.
+    """
+
+    def __init__(self, node, index, argv, workdir, staged, env, shared, handoff):
+        self.node = node
+        self.index = index
+        self.argv = argv  # Arguments as they would be passed to the script in bin
+        self.workdir = workdir
+        self.staged = staged  # Files symlinked into the work dir (name: source)
+        self.env = env  # Nextflow variable names with the values of the task
+        self.shared = shared  # Parameters opened memory-mapped from shared segments
+        self.handoff = handoff  # Output files written as shared segments instead
+
+
+def runTask(
+    node: flowNodes.nextflowProcess,
+    argv: list,
+    workdir: str,
+    staged: dict,
+    shared: Union[None, dict] = None,
+    handoff: Union[None, dict] = None,
+) -> int:
+    """
+    Execute the process function of a node inside its task directory, the same way as
+    the generated script would do it. Runs in the worker processes of the pool.
+    Wall time of the task is recorded in `.command.trace`. Nodes asking for `scratch`
+    run in a temporary folder, with inputs and outputs staged in and out the way their
+    `stageInMode` and `stageOutMode` say. Checkpoints are kept in `.checkpoint` of the
+    task directory, so that a rerun of the task resumes from them.
+
+    Parameters
+    ----------
+    node
+        The process node.
+    argv
+        Command line arguments of the task.
+    workdir
+        The task directory under `work`.
+    staged
+        Input files that need to be linked into the task directory.
+    shared
+        Parameters receiving a memory-mapped object instead of the staged file name.
+    handoff
+        Output file names with the shared segment they should be written to instead.
+
+    Returns
+    -------
+    Exit code of the task.
+    """
+
+    crdir = os.getcwd()
+    os.makedirs(workdir, exist_ok=True)
+    settings = node.staging_settings()
+    checkpointed = os.environ.get(checkpoints.checkpointVariable)
+    os.environ[checkpoints.checkpointVariable] = workdir + "/.checkpoint"
+    exitcode, written, rundir = 1, [], workdir
+    started = time.time()
+    try:
+        rundir = scratchDirectory(settings.get("scratch"), workdir)
+        os.chdir(rundir)
+        with open(".command.sh", "w") as f:
+            f.write(node.processname + ".py " + " ".join(argv) + "\n")
+        with open(".command.out", "w") as f, contextlib.redirect_stdout(f):
+            try:
+                for k, v in staged.items():
+                    if os.path.isdir(k) and not os.path.islink(k):
+                        shutil.rmtree(k)
+                    elif os.path.lexists(k):
+                        os.remove(k)  # Left by an earlier run, maybe for another item
+                    stageIn(v, k, settings.get("stageInMode", "symlink"))
+                mainFunction = commandLines.cmdConnect(
+                    node.process.__func__, node.modified_kws
+                )
+                preloaded = dict()
+                if shared is not None:
+                    for k, v in shared.items():
+                        preloaded[k] = sharedHandoff.openShared(v)
+                mainFunction.eval(argv, preloaded)
+                if handoff is not None:
+                    kept = []
+                    for fn, r in mainFunction.results:
+                        if fn in handoff and sharedHandoff.sharedExtension(r):
+                            written.append(sharedHandoff.writeShared(r, handoff[fn]))
+                            if os.path.lexists(fn):
+                                os.remove(fn)
+                            os.symlink(written[-1], fn)
+                        else:
+                            kept.append((fn, r))
+                    mainFunction.results = kept
+                mainFunction.save()
+                exitcode = 0
+            except Exception:
+                for fn in written:
+                    if os.path.isfile(fn):
+                        os.remove(fn)
+                with open(".command.err", "w") as g:
+                    g.write(traceback.format_exc())
+        if rundir != workdir:
+            stageOut(rundir, workdir, settings.get("stageOutMode", "copy"), staged)
+    except Exception:
+        exitcode = 1
+        with open(workdir + "/.command.err", "a") as g:
+            g.write(traceback.format_exc())
+    finally:
+        os.chdir(workdir)
+        if rundir != workdir:
+            shutil.rmtree(rundir, ignore_errors=True)
+        with open(".exitcode", "w") as f:
+            f.write(str(exitcode))
+        with open(".command.trace", "w") as f:
+            json.dump(
+                {
+                    "process": node.processname,
+                    "realtime": time.time() - started,
+                    "exit": exitcode,
+                },
+                f,
+            )
+        os.chdir(crdir)
+        if checkpointed is None:
+            os.environ.pop(checkpoints.checkpointVariable, None)
+        else:
+            os.environ[checkpoints.checkpointVariable] = checkpointed
+    return exitcode
+
+
+def scratchDirectory(scratch: Union[None, bool, str], workdir: str) -> str:
+    """
+    Folder a task runs in: a new temporary folder if the node asks for scratch (in
+    `TMPDIR`, the given path or the shared memory folder for `ram-disk`), the task
+    directory otherwise.
+    """
+
+    if scratch in [None, False]:
+        return workdir
+    dr = None
+    if scratch == "ram-disk":
+        dr = sharedHandoff.sharedDirectory()
+    elif isinstance(scratch, str):
+        dr = os.path.expandvars(scratch)
+        os.makedirs(dr, exist_ok=True)
+    return tempfile.mkdtemp(prefix="nxf.", dir=dr)
+
+
+def stageIn(source: str, name: str, mode: str = "symlink") -> None:
+    """
+    Put an input file into the task folder as `stageInMode` would.
+    """
+
+    if mode == "symlink":
+        os.symlink(source, name)
+    elif mode == "rellink":
+        os.symlink(os.path.relpath(source), name)
+    elif mode == "link":
+        try:
+            os.link(source, name)
+        except OSError:
+            shutil.copy2(source, name)  # Hard links do not cross file systems
+    elif os.path.isdir(source):
+        shutil.copytree(source, name, symlinks=True)
+    else:
+        shutil.copy2(source, name)
+
+
+def stageOut(rundir: str, workdir: str, mode: str = "copy", staged=None) -> None:
+    """
+    Bring everything a task created in its scratch folder (outputs and the `.command`
+    files, not the staged inputs) back to the task directory as `stageOutMode` would.
+    """
+
+    if staged is None:
+        staged = dict()
+    names = [e for e in os.listdir(rundir) if e not in staged]
+    if mode == "rsync" and shutil.which("rsync") is not None:
+        subprocess.run(
+            ["rsync", "-a"] + [rundir + "/" + e for e in names] + [workdir + "/"],
+            check=True,
+        )
+        return
+    for e in names:
+        source, target = rundir + "/" + e, workdir + "/" + e
+        if mode == "move":
+            shutil.move(source, target)
+        elif os.path.isdir(source) and not os.path.islink(source):
+            shutil.copytree(source, target, symlinks=True, dirs_exist_ok=True)
+        else:
+            shutil.copy2(source, target, follow_symlinks=False)
+
+
+class inlinePool:
+    """
+    Drop-in replacement of the process pool that runs every task as soon as it is
+    submitted. Serves as the sequential baseline.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        return
+
+
+def runLocally(
+    *args,
+    location="",
+    main_kws=None,
+    channels=None,
+    workers=None,
+    ignore_errors=False,
+    handoff=False,
+    verbose=True,
+) -> dict:
+    """
+    Run process nodes on the local machine without Nextflow. Tasks are scheduled
+    in a process pool as soon as every input channel of the node has an item.
+
+    Parameters
+    ----------
+    args
+        Process node objects, the same ones `channelNodes` compiles into a pipeline.
+    location
+        Pipeline folder; task directories are created in its `work` subfolder.
+    main_kws
+        Parameters of the pipeline (the ones that would go into `nextflow.config`).
+    channels
+        Items of channels that are not produced by any node (e.g. those created by
+        `channel_pretreat` in Groovy), keyed by channel name.
+    workers
+        Size of the process pool. Tasks run one after the other if set to 1.
+    ignore_errors
+        Keep going if a task fails (like `errorStrategy 'ignore'`).
+    handoff
+        Hand arrays and data frames over as `.npy` or Arrow files in shared memory
+        (`/dev/shm`), opened memory-mapped by consumers, instead of TSV. Applies to
+        channels whose consumers all annotate the parameter as an array or data frame.
+        Segments are moved into the task folders once consumed, so returned items stay valid.
+    verbose
+        Report tasks as they are submitted.
+
+    Returns
+    -------
+    Items of every channel, keyed by channel name.
+    """
+
+    if main_kws is None:
+        main_kws = dict()
+    if channels is None:
+        channels = dict()
+    workdir = os.path.realpath(location) + "/work"
+    os.makedirs(workdir, exist_ok=True)
+
+    ### Set up channels and the input sources of every node
+    queues = dict([(k, localChannel(list(v))) for k, v in channels.items()])
+    for k in queues:
+        queues[k].closed = True
+    nodes, producers = [], dict()
+    for node in args:
+        inputs, values, outputs = channelRoles(node, main_kws)
+        state = {
+            "node": node,
+            "arguments": commandLines.cmdConnect(
+                node.process.__func__, node.modified_kws
+            ),
+            "inputs": inputs,
+            "values": values,
+            "outputs": outputs,
+            "cursors": dict([(k, 0) for k in inputs]),
+            "launched": 0,
+            "running": 0,
+            "done": False,
+        }
+        for k in outputs:
+            for name in outputNames(k):
+                if name in channels:
+                    raise ValueError(
+                        "Channel " + name + " is both seeded and produced by a node!!!"
+                    )
+                queues[name] = localChannel()
+                producers.setdefault(name, []).append(state)
+        nodes.append(state)
+    for state in nodes:
+        for k, v in state["inputs"].items():
+            if v[4]:
+                items = main_kws.get(k, state["node"].params.get(k))
+                if isinstance(items, (list, tuple)):
+                    queues[(state["node"].processname, k)] = localChannel(
+                        list(items), closed=True
+                    )
+                else:
+                    queues[(state["node"].processname, k)] = localChannel(
+                        [items], closed=True, value=True
+                    )
+            else:
+                if k not in queues:
+                    raise ValueError(
+                        "Channel "
+                        + k
+                        + " is neither produced by a node nor supplied in channels!!!"
+                    )
+
+    consumers = dict()
+    for state in nodes:
+        for k, v in state["inputs"].items():
+            if not v[4]:
+                consumers.setdefault(k, []).append((state, v))
+    sharedChannels = set()
+    if handoff:
+        for k, c in consumers.items():
+            if all([acceptsShared(state["arguments"], v) for state, v in c]):
+                sharedChannels.add(k)
+    segments = sharedHandoff.sharedSegments()
+
+    def source(state, k):
+        if state["inputs"][k][4]:
+            return queues[(state["node"].processname, k)]
+        return queues[k]
+
+    def fireable(state):
+        if state["done"]:
+            return False
+        queued = [k for k in state["inputs"] if not source(state, k).value]
+        if len(queued) == 0:
+            return state["launched"] == 0
+        for k in queued:
+            if state["cursors"][k] >= len(source(state, k).items):
+                return False
+        return True
+
+    def finished(state):
+        if state["running"] > 0:
+            return False
+        queued = [k for k in state["inputs"] if not source(state, k).value]
+        if len(queued) == 0:
+            return state["launched"] > 0
+        for k in queued:
+            ch = source(state, k)
+            if ch.closed and state["cursors"][k] >= len(ch.items):
+                return True
+        return False
+
+    ### Launch tasks whenever inputs are available and collect their outputs
+    if workers == 1:
+        pool = inlinePool()
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    pending = dict()
+    try:
+        while True:
+            for state in nodes:
+                while fireable(state):
+                    items = dict()
+                    for k in state["inputs"]:
+                        ch = source(state, k)
+                        if ch.value:
+                            items[k] = ch.items[0]
+                        else:
+                            items[k] = ch.items[state["cursors"][k]]
+                            state["cursors"][k] += 1
+                    task = prepareTask(state, items, workdir, sharedChannels)
+                    hint(
+                        verbose,
+                        "Submitting task:",
+                        task.node.processname,
+                        "(" + str(task.index) + ")",
+                    )
+                    state["launched"] += 1
+                    state["running"] += 1
+                    future = pool.submit(
+                        runTask,
+                        task.node,
+                        task.argv,
+                        task.workdir,
+                        task.staged,
+                        task.shared,
+                        task.handoff,
+                    )
+                    pending[future] = (state, task)
+            for state in nodes:
+                if not state["done"] and finished(state):
+                    state["done"] = True
+                    for k in state["outputs"]:
+                        for name in outputNames(k):
+                            queues[name].closed = all(
+                                [s["done"] for s in producers[name]]
+                            )
+            if len(pending) == 0:
+                break
+            completed, rest = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in [f for f in pending if f in completed]:  # In submission order
+                state, task = pending.pop(future)
+                state["running"] -= 1
+                exitcode = future.result()
+                for k in task.shared.values():
+                    segments.release(task.staged[k])
+                if exitcode != 0:
+                    msg = (
+                        "Task "
+                        + task.node.processname
+                        + " ("
+                        + str(task.index)
+                        + ") failed, see "
+                        + task.workdir
+                        + "/.command.err"
+                    )
+                    if ignore_errors:
+                        hint(verbose, msg)
+                        continue
+                    raise RuntimeError(msg)
+                for k, v in state["outputs"].items():
+                    item = collectOutput(v, task)
+                    for name in outputNames(k):
+                        queues[name].items.append(item)
+                    if isinstance(item, str) and sharedHandoff.isSegment(item):
+                        segments.register(
+                            item,
+                            sum([len(consumers.get(n, [])) for n in outputNames(k)]),
+                        )
+    finally:
+        pool.shutdown(wait=True)
+        segments.cleanup()
+
+    return dict(
+        [(k, v.items) for k, v in queues.items() if not isinstance(k, tuple)]
+    )
+
+
+def channelRoles(
+    node: flowNodes.nextflowProcess,
+    main_kws: dict,
+) -> Tuple[dict, dict, dict]:
+    """
+    Sort the channel specifications of a node into inputs and outputs, the same way
+    `compile_inputs` and `compile_outputs` do.
+
+    Parameters
+    ----------
+    node
+        The process node.
+    main_kws
+        Parameters of the pipeline.
+
+    Returns
+    -------
+    Input channel specifications, parameters that are not bound to a channel and output
+    channel specifications.
+    """
+
+    inputs, outputs = dict(), dict()
+    params = dict()
+    for k, v in node.params.items():
+        if isinstance(k, tuple):
+            for i, q in enumerate(k):
+                if q not in [None, ""]:
+                    params[q] = v[i]
+        else:
+            if k not in [None, ""]:
+                params[k] = v
+    for k, v in node.channel_specifications().items():
+        if v[0] is None:
+            continue
+        if k in node.outchannels:
+            outputs[k] = v
+        else:
+            inputs[k] = v
+            for e in pythonVariables(v):
+                params.pop(e, None)
+    for k in list(params.keys()):
+        if k in main_kws:
+            params[k] = main_kws[k]
+    return inputs, params, outputs
+
+
+def outputNames(k: Union[str, tuple]) -> list:
+    """
+    Channel names an output is sent into (`into{a; b}` is written as a tuple key).
+    """
+
+    if isinstance(k, tuple):
+        return list(k)
+    return [k]
+
+
+def pythonVariables(v: tuple) -> list:
+    """
+    Names of Python variables in a channel specification.
+    """
+
+    if type(v[2]) is not tuple:
+        return [v[2]]
+    return list(v[2])
+
+
+def nextflowVariables(v: tuple) -> list:
+    """
+    Names of Nextflow variables in a channel specification, with a flag telling if
+    they are files.
+    """
+
+    if type(v[1]) is tuple:
+        channelVariables = list(v[1])
+    else:
+        if v[1].find("$") > -1:
+            channelVariables = [v[1]]
+        else:
+            channelVariables = v[1].split(", ")
+    variables = []
+    for e in channelVariables:
+        isFile = v[0] == "file"
+        if e[0] == "*":
+            e = e[1:]
+        if e[:5] == "file(":
+            isFile = True
+            e = e[5:-1]
+        if e[:4] == "val(":
+            e = e[4:-1]
+        variables.append((e, isFile))
+    return variables
+
+
+def acceptsShared(arguments: commandLines.cmdConnect, v: tuple) -> bool:
+    """
+    Check if a consumer takes the items of a channel as an array or data frame.
+
+    Parameters
+    ----------
+    arguments
+        The command line interface of the consumer function.
+    v
+        Input channel specification of the consumer.
+
+    Returns
+    -------
+    True if the channel can be handed over in shared memory.
+    """
+
+    variables = pythonVariables(v)
+    if len(variables) != 1 or variables[0] in [None, "None", ""]:
+        return False
+    return arguments.spect.annotations.get(variables[0]) in sharedHandoff.sharedTypes
+
+
+def prepareTask(
+    state: dict,
+    items: dict,
+    workdir: str,
+    sharedChannels: Union[None, set] = None,
+) -> localTask:
+    """
+    Translate channel items and parameters of a node into command line arguments of
+    a new task, in a Nextflow-like task directory.
+
+    Parameters
+    ----------
+    state
+        Scheduling state of the node.
+    items
+        The current item of every input channel.
+    workdir
+        The `work` folder of the pipeline.
+    sharedChannels
+        Channels handed over as shared segments.
+
+    Returns
+    -------
+    A task ready to be submitted.
+    """
+
+    if sharedChannels is None:
+        sharedChannels = set()
+    node = state["node"]
+    index = state["launched"] + 1
+    values, staged, env, lazy = dict(), dict(), dict(), []
+    shared, handoff = dict(), dict()
+    for k, v in state["inputs"].items():
+        item = items[k]
+        variables = nextflowVariables(v)
+        if len(variables) == 1:
+            item = (item,)
+        for (name, isFile), e, x in zip(variables, pythonVariables(v), item):
+            if isFile and x is not None:
+                if isinstance(x, (list, tuple)):
+                    x = [stageFile(staged, y) for y in x]
+                else:
+                    x = stageFile(staged, x)
+            env[name] = x
+            if e in [None, "None"]:
+                continue
+            if e == "" or e[0] == "*":
+                lazy += [str(x)]
+            else:
+                values[e] = x
+                if k in sharedChannels and isinstance(x, str):
+                    shared[e] = x
+    for k, v in state["values"].items():
+        if k not in values:
+            values[k] = v
+    for k, v in state["outputs"].items():
+        for (name, isFile), e in zip(nextflowVariables(v), pythonVariables(v)):
+            if e in [None, "None", ""]:
+                continue
+            if name[0] in ["'", '"']:
+                values[e] = interpolate(name[1:-1], env)
+            else:
+                values[e] = env.get(name)
+
+    argv = commandArguments(node, values, state["arguments"]) + lazy
+    digest = hashlib.md5(
+        (node.processname + str(index) + " ".join(argv)).encode()
+    ).hexdigest()
+    taskdir = workdir + "/" + digest[:2] + "/" + digest[2:]
+
+    for k, v in state["outputs"].items():
+        if not all([n in sharedChannels for n in outputNames(k)]):
+            continue
+        variables = nextflowVariables(v)
+        if len(variables) != 1 or variables[0][0][0] not in ["'", '"']:
+            continue
+        fn = values.get(pythonVariables(v)[0])
+        if isinstance(fn, str) and fn.find("*") < 0 and fn.find("/") < 0:
+            handoff[fn] = (
+                sharedHandoff.sharedDirectory()
+                + "/introspect_"
+                + digest
+                + "_"
+                + os.path.splitext(fn)[0]
+            )
+    return localTask(node, index, argv, taskdir, staged, env, shared, handoff)
+
+
+def stageFile(staged: dict, fn: str) -> str:
+    """
+    Register a file to be symlinked into the task directory and return its name there.
+    """
+
+    name = os.path.basename(fn)
+    staged[name] = os.path.realpath(fn)
+    return name
+
+
+def interpolate(s: str, env: dict) -> str:
+    """
+    Substitute Nextflow variables (`$x` or `${x}`) in a file name pattern.
+    """
+
+    for k, v in sorted(env.items(), key=lambda x: -len(x[0])):
+        s = s.replace("${" + k + "}", str(v)).replace("$" + k, str(v))
+    return s
+
+
+def commandArguments(
+    node: flowNodes.nextflowProcess,
+    values: dict,
+    arguments: Union[None, commandLines.cmdConnect] = None,
+) -> list:
+    """
+    Command line arguments for the script of a node, the ones `compile_command` would
+    render into the Nextflow process.
+
+    Parameters
+    ----------
+    node
+        The process node.
+    values
+        Values of the Python variables, keyed by name.
+    arguments
+        The command line interface of the process function, if already created.
+
+    Returns
+    -------
+    List of command line arguments.
+    """
+
+    if arguments is None:
+        arguments = commandLines.cmdConnect(node.process.__func__, node.modified_kws)
+    positionals, flags = [], []
+    for p, v in values.items():
+        if v is None:
+            continue
+        if isinstance(v, (list, tuple)):
+            v = [str(x) for x in v]
+        else:
+            v = [str(v)]
+        if p in arguments.argreverse:
+            flag = arguments.argreverse[p].strip()
+        else:
+            if p in node.modified_kws:
+                t = node.modified_kws[p]
+                if type(t[-1]) == dict:
+                    flag = t[1:-1][0]
+                else:
+                    flag = t[1]
+            else:
+                flag = "--" + p
+        if flag == "":
+            positionals.append((p, v))
+        else:
+            flags += [flag] + v
+    order = arguments.spect.args
+    positionals.sort(key=lambda x: order.index(x[0]) if x[0] in order else len(order))
+    return sum([v for p, v in positionals], []) + flags
+
+
+def collectOutput(v: tuple, task: localTask) -> Union[str, list, tuple]:
+    """
+    Find the outputs of a finished task as declared in the output channel specification.
+
+    Parameters
+    ----------
+    v
+        Output channel specification.
+    task
+        The finished task.
+
+    Returns
+    -------
+    The item to be emitted into the output channel.
+    """
+
+    item = []
+    for name, isFile in nextflowVariables(v):
+        if name[0] in ["'", '"']:
+            pattern = interpolate(name[1:-1], task.env)
+            found = sorted(glob.glob(task.workdir + "/" + pattern))
+            if len(found) == 1:
+                item.append(found[0])
+            else:
+                item.append(found)
+        else:
+            x = task.env.get(name)
+            if isFile and x is not None:
+                if isinstance(x, list):
+                    x = [task.staged[y] for y in x]
+                else:
+                    x = task.staged[x]
+            item.append(x)
+    if len(item) == 1:
+        return item[0]
+    return tuple(item)
+
+
+def spin(n: int) -> int:
+    """
+    Burn CPU for a while, to emulate computation in the benchmark.
+    """
+
+    s = 0
+    for i in range(n):
+        s += i * i % 7
+    return s
+
+
+class diamondSource(flowNodes.nextflowProcess):
+    """
+    Top of the diamond-shaped benchmark pipeline.
+    """
+
+    def channel_specifications(self):
+        return {
+            "diamond_items": ("val", "diamond_items", "item", None, True),
+            ("diamond_left", "diamond_right"): (
+                "file",
+                "'item.txt'",
+                "outFile",
+                None,
+                False,
+            ),
+        }
+
+    def process(self, item: int) -> str:
+        """
+        Write the workload of an item.
+
+        Parameters
+        ----------
+        item
+            Amount of work.
+        """
+
+        return str(item)
+
+
+class diamondLeft(flowNodes.nextflowProcess):
+    """
+    Left branch of the diamond-shaped benchmark pipeline.
+    """
+
+    def channel_specifications(self):
+        return {
+            "diamond_left": ("file", "item", "fn", None, False),
+            "diamond_joined_left": ("file", "'left.txt'", "outFile", None, False),
+        }
+
+    def process(self, fn: str) -> str:
+        """
+        Do some work on the left.
+
+        Parameters
+        ----------
+        fn
+            File with the amount of work.
+        """
+
+        with open(fn) as f:
+            return str(spin(int(f.read())))
+
+
+class diamondRight(diamondLeft):
+    """
+    Right branch of the diamond-shaped benchmark pipeline.
+    """
+
+    def channel_specifications(self):
+        return {
+            "diamond_right": ("file", "item", "fn", None, False),
+            "diamond_joined_right": ("file", "'right.txt'", "outFile", None, False),
+        }
+
+
+class diamondJoin(flowNodes.nextflowProcess):
+    """
+    Bottom of the diamond-shaped benchmark pipeline.
+    """
+
+    def channel_specifications(self):
+        return {
+            "diamond_joined_left": ("file", "left", "left", None, False),
+            "diamond_joined_right": ("file", "right", "right", None, False),
+            "diamond_sums": ("file", "'sum.txt'", "outFile", None, False),
+        }
+
+    def process(self, left: str, right: str) -> str:
+        """
+        Combine the two branches.
+
+        Parameters
+        ----------
+        left
+            Result of the left branch.
+        right
+            Result of the right branch.
+        """
+
+        with open(left) as f, open(right) as g:
+            return str(int(f.read()) + int(g.read()))
+
+
+def benchmarkDiamond(
+    location: str,
+    *,
+    width: int = 16,
+    workload: int = 2000000,
+    workers: Union[None, int] = None,
+    verbose: bool = True,
+) -> dict:
+    """
+    Compare the process pool with the sequential baseline on a diamond-shaped pipeline
+    (one source, two independent branches, one join per item).
+
+    Parameters
+    ----------
+    location
+        Folder where the benchmark pipelines are run.
+    width
+        Number of items flowing through the diamond.
+    workload
+        Loop length burning CPU in each branch task.
+    workers
+        Size of the process pool (number of CPUs if not set).
+    verbose
+        Print the timings.
+
+    Returns
+    -------
+    Wall clock seconds of the sequential and the parallel run.
+    """
+
+    timings = dict()
+    for name, n in [("sequential", 1), ("parallel", workers)]:
+        nodes = [
+            diamondSource(
+                inchannels=["diamond_items"],
+                outchannels=[("diamond_left", "diamond_right")],
+            ),
+            diamondLeft(outchannels=["diamond_joined_left"]),
+            diamondRight(outchannels=["diamond_joined_right"]),
+            diamondJoin(outchannels=["diamond_sums"]),
+        ]
+        t = time.time()
+        runLocally(
+            *nodes,
+            location=location + "/" + name,
+            main_kws={"diamond_items": [workload] * width},
+            workers=n,
+            verbose=False,
+        )
+        timings[name] = time.time() - t
+        hint(verbose, name, "run:", "{:.2f}".format(timings[name]), "s")
+    return timings
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, io, json, hashlib, threading
+from typing import Union
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+hashedOutputs = set()  # Output files that are hashed while they are written
+outputDigests = dict()  # Size, line count and checksum of hashed outputs, by path
+digestLock = threading.Lock()
+
+
+def checksumAlgorithm() -> str:
+    """
+    Name of the checksum used in manifests: xxh3 (128 bit) if xxhash is installed,
+    blake2b (128 bit) otherwise.
+    """
+
+    if xxhash is not None:
+        return "xxh3_128"
+    return "blake2b_128"
+
+
+def newHasher():
+    """
+    A new hash object of the manifest checksum.
+    """
+
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+class hashingWriter(io.RawIOBase):
+    """
+    Binary file writer that hashes and counts the bytes (and lines) passing through,
+    so that the checksum is ready when the file is closed without reading it back.
+    """
+
+    def __init__(self, fn: str):
+        self.fn = fn
+        self.f = open(fn, "wb")
+        self.hasher = newHasher()
+        self.size = 0
+        self.lines = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        b = bytes(b)
+        self.hasher.update(b)
+        self.size += len(b)
+        self.lines += b.count(b"\n")
+        return self.f.write(b)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.f.close()
+            with digestLock:
+                outputDigests[os.path.realpath(self.fn)] = {
+                    "size": self.size,
+                    "lines": self.lines,
+                    "checksum": self.hasher.hexdigest(),
+                }
+        super().close()
+
+
+def openOutput(fn: str, mode: str = "w"):
+    """
+    Open an output file for writing. Files registered in `hashedOutputs` get a hashing
+    writer, everything else a plain file object.
+
+    Parameters
+    ----------
+    fn
+        Path to the output file.
+    mode
+        `w` for text, `wb` for binary.
+
+    Returns
+    -------
+    A writable file object.
+    """
+
+    if os.path.realpath(fn) not in hashedOutputs:
+        return open(fn, mode)
+    f = io.BufferedWriter(hashingWriter(fn))
+    if "b" in mode:
+        return f
+    return io.TextIOWrapper(f, encoding="utf-8", newline="")
+
+
+def fileDigest(fn: str) -> dict:
+    """
+    Size, line count and checksum of a file that was written without a hashing writer
+    (figures, stores), read back once.
+    """
+
+    hasher, size, lines = newHasher(), 0, 0
+    with open(fn, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+            size += len(block)
+            lines += block.count(b"\n")
+    return {"size": size, "lines": lines, "checksum": hasher.hexdigest()}
+
+
+def outputDigest(fn: str) -> Union[None, dict]:
+    """
+    Digest of a single output: recorded during writing if possible, read back otherwise.
+    """
+
+    target = os.path.realpath(fn)
+    with digestLock:
+        digest = outputDigests.pop(target, None)
+    if digest is None and os.path.isfile(target):
+        digest = fileDigest(target)
+    return digest
+
+
+def writeManifest(fn: str, rows: Union[None, int] = None) -> Union[None, str]:
+    """
+    Write `<fn>.manifest.json` with the size, number of lines and rows and the checksum
+    of an output, so that caches and downstream loaders do not have to rescan it.
+    For folders (chunked stores), every file in it gets an entry.
+
+    Parameters
+    ----------
+    fn
+        The output file.
+    rows
+        Number of records in the result (length of the data frame, array or list).
+
+    Returns
+    -------
+    Path to the manifest, None if the output was not written to a file.
+    """
+
+    manifest = {"file": os.path.basename(fn), "algorithm": checksumAlgorithm()}
+    if rows is not None:
+        manifest["rows"] = int(rows)
+    if os.path.isdir(fn):
+        files = dict()
+        for dr, subdirs, fns in os.walk(fn):
+            for e in sorted(fns):
+                p = os.path.join(dr, e)
+                files[os.path.relpath(p, fn)] = outputDigest(p)
+        manifest["size"] = sum([d["size"] for d in files.values()])
+        manifest["files"] = files
+    else:
+        digest = outputDigest(fn)
+        if digest is None:
+            return None
+        manifest.update(digest)
+    with open(fn + ".manifest.json", "w") as f:
+        json.dump(manifest, f, indent=1)
+    return fn + ".manifest.json"
+
+
+def readManifest(fn: str) -> Union[None, dict]:
+    """
+    The manifest of a file if it still describes it: `<fn>.manifest.json` next to the
+    file (or next to the target of a link), written after the file and recording its
+    current size.
+
+    Parameters
+    ----------
+    fn
+        Path to the file.
+
+    Returns
+    -------
+    The manifest, None if there is no matching one.
+    """
+
+    target = os.path.realpath(fn)
+    try:
+        st = os.stat(target)
+    except FileNotFoundError:
+        return None
+    for mfn in [fn + ".manifest.json", target + ".manifest.json"]:
+        try:
+            if os.stat(mfn).st_mtime_ns < st.st_mtime_ns:
+                continue
+            with open(mfn) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if manifest.get("size") == st.st_size and "checksum" in manifest:
+            return manifest
+    return None
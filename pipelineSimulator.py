@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re, csv, glob, json, heapq, collections
+from typing import Union
+from . import flowNodes, localExecutor, hint
+
+
+def pipelineGraph(*args) -> dict:
+    """
+    Derive the dependency graph of process nodes from their channel specifications.
+
+    Parameters
+    ----------
+    args
+        Process node objects, the same ones `channelNodes` compiles into a pipeline.
+
+    Returns
+    -------
+    Names of upstream processes for every process.
+    """
+
+    producers = dict()
+    roles = dict()
+    for node in args:
+        inputs, values, outputs = localExecutor.channelRoles(node, dict())
+        roles[node.processname] = inputs
+        for k in outputs:
+            for name in localExecutor.outputNames(k):
+                producers.setdefault(name, []).append(node.processname)
+    graph = dict()
+    for node in args:
+        upstream = []
+        for k, v in roles[node.processname].items():
+            if not v[4]:
+                for p in producers.get(k, []):
+                    if p not in upstream:
+                        upstream.append(p)
+        graph[node.processname] = upstream
+    return graph
+
+
+def parseDuration(s: str) -> float:
+    """
+    Convert a Nextflow duration (`1h 2m 3s`, `250ms`, or raw milliseconds) to seconds.
+    """
+
+    s = s.strip()
+    if s in ["", "-"]:
+        return 0.0
+    try:
+        return float(s) / 1000
+    except:
+        pass
+    units = {"d": 86400, "h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    seconds = 0.0
+    for value, unit in re.findall(r"([\d.]+)\s*(ms|d|h|m|s)", s):
+        seconds += float(value) * units[unit]
+    return seconds
+
+
+def readTrace(fn: str) -> dict:
+    """
+    Collect task durations from a Nextflow trace file (`-with-trace`).
+
+    Parameters
+    ----------
+    fn
+        Path to the trace file.
+
+    Returns
+    -------
+    Task durations in seconds, keyed by process name.
+    """
+
+    durations = dict()
+    with open(fn) as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            if "process" in row:
+                process = row["process"]
+            else:
+                process = row["name"].split(" (")[0]
+            if row.get("status", "COMPLETED") not in ["COMPLETED", "CACHED"]:
+                continue
+            durations.setdefault(process, []).append(
+                parseDuration(row.get("realtime", row.get("duration", "")))
+            )
+    return durations
+
+
+def readSidecars(location: str) -> dict:
+    """
+    Collect task durations from the `.command.trace` files the local executor leaves
+    in task directories.
+
+    Parameters
+    ----------
+    location
+        Pipeline folder (with a `work` subfolder).
+
+    Returns
+    -------
+    Task durations in seconds, keyed by process name.
+    """
+
+    durations = dict()
+    for fn in glob.glob(location + "/work/*/*/.command.trace"):
+        with open(fn) as f:
+            trace = json.load(f)
+        if trace.get("exit", 0) == 0:
+            durations.setdefault(trace["process"], []).append(trace["realtime"])
+    return durations
+
+
+def nodeCpus(node: flowNodes.nextflowProcess) -> int:
+    """
+    Number of CPUs a task of the node asks for (`cpus` directive or process setting).
+    """
+
+    cpus = node.directives().get("cpus")
+    if cpus is None and node.process_settings is not None:
+        cpus = node.process_settings.get("cpus")
+    try:
+        return int(cpus)
+    except:
+        return 1
+
+
+def simulateMakespan(
+    *args,
+    durations: dict,
+    tasks: Union[None, dict] = None,
+    queueSize: Union[None, int] = None,
+    cpuBudget: Union[None, int] = None,
+) -> dict:
+    """
+    Discrete-event simulation of the pipeline under a given queue size and CPU budget.
+    Task `i` of a process waits for task `i` of every upstream process with the same
+    number of tasks, and for all tasks of upstream processes with a different number.
+
+    Parameters
+    ----------
+    args
+        Process node objects.
+    durations
+        Observed task durations (seconds) keyed by process name, e.g. from `readTrace`
+        or `readSidecars`. Observed values are reused in order; processes without
+        observations take no time.
+    tasks
+        Number of tasks per process, if different from the number of observations.
+    queueSize
+        Maximum number of tasks submitted at the same time (`queueRestriction`).
+    cpuBudget
+        Number of CPUs the running tasks can use together.
+
+    Returns
+    -------
+    Estimated makespan, the critical path and per-process utilization.
+    """
+
+    if queueSize is not None and queueSize < 1:
+        raise ValueError("Queue size has to be at least 1, got " + str(queueSize) + "!!!")
+    if cpuBudget is not None and cpuBudget < 1:
+        raise ValueError("CPU budget has to be at least 1, got " + str(cpuBudget) + "!!!")
+    if tasks is None:
+        tasks = dict()
+    graph = pipelineGraph(*args)
+    cpus = dict([(node.processname, nodeCpus(node)) for node in args])
+    counts, times = dict(), dict()
+    for p in graph:
+        observed = durations.get(p, [])
+        if len(observed) == 0:
+            observed = [0.0]
+        counts[p] = tasks.get(p, len(durations.get(p, [])) or 1)
+        times[p] = [observed[i % len(observed)] for i in range(counts[p])]
+        if cpuBudget is not None and cpus[p] > cpuBudget:
+            raise ValueError(
+                "Process " + p + " needs more CPUs than the budget allows!!!"
+            )
+
+    ### Task-level dependencies
+    depends = dict()
+    for p, upstream in graph.items():
+        for i in range(counts[p]):
+            d = []
+            for u in upstream:
+                if counts[u] == counts[p]:
+                    d.append((u, i))
+                else:
+                    d += [(u, j) for j in range(counts[u])]
+            depends[(p, i)] = d
+    waiting = dict([(t, len(d)) for t, d in depends.items()])
+    followers = dict([(t, []) for t in depends])
+    for t, d in depends.items():
+        for u in d:
+            followers[u].append(t)
+
+    ### Event loop: submit ready tasks in the order they became ready
+    order = list(graph.keys())
+    ready = collections.deque(
+        sorted(
+            [t for t, n in waiting.items() if n == 0],
+            key=lambda t: (order.index(t[0]), t[1]),
+        )
+    )
+    running, clock, free = [], 0.0, cpuBudget
+    start, end = dict(), dict()
+    while len(ready) > 0 or len(running) > 0:
+        skipped = []
+        while len(ready) > 0:
+            if queueSize is not None and len(running) >= queueSize:
+                break
+            if free is not None and free < 1:
+                break
+            t = ready.popleft()
+            if free is not None and cpus[t[0]] > free:
+                skipped.append(t)
+                continue
+            start[t] = clock
+            heapq.heappush(running, (clock + times[t[0]][t[1]], t))
+            if free is not None:
+                free -= cpus[t[0]]
+        ready.extendleft(reversed(skipped))
+        clock, t = heapq.heappop(running)
+        end[t] = clock
+        if free is not None:
+            free += cpus[t[0]]
+        for f in followers[t]:
+            waiting[f] -= 1
+            if waiting[f] == 0:
+                ready.append(f)
+
+    ### Critical path: the chain of tasks without slack, ignoring resource limits
+    finish, previous, ranks = dict(), dict(), dict()
+    for t in sorted(depends, key=lambda t: topologicalRank(graph, t[0], ranks)):
+        earliest, before = 0.0, None
+        for u in depends[t]:
+            if finish[u] > earliest:
+                earliest, before = finish[u], u
+        finish[t] = earliest + times[t[0]][t[1]]
+        previous[t] = before
+    path = []
+    t = max(finish, key=finish.get) if len(finish) > 0 else None
+    while t is not None:
+        path.insert(0, t)
+        t = previous[t]
+
+    makespan = max(list(end.values()) + [0.0])
+    capacity = makespan * (cpuBudget or sum([cpus[t[0]] for t in start]) or 1)
+    utilization = dict()
+    for p in graph:
+        busy = sum([times[p][i] * cpus[p] for i in range(counts[p])])
+        utilization[p] = {
+            "tasks": counts[p],
+            "busy": busy,
+            "utilization": busy / capacity if capacity > 0 else 0.0,
+            "first_start": min([start[(p, i)] for i in range(counts[p])]),
+            "last_end": max([end[(p, i)] for i in range(counts[p])]),
+        }
+    return {
+        "makespan": makespan,
+        "critical_path": [p for p, i in path],
+        "critical_length": finish[path[-1]] if len(path) > 0 else 0.0,
+        "processes": utilization,
+    }
+
+
+def topologicalRank(graph: dict, p: str, ranks: Union[None, dict] = None) -> int:
+    """
+    Depth of a process in the pipeline graph (sources have rank 0).
+    """
+
+    if ranks is None:
+        ranks = dict()
+    if p not in ranks:
+        ranks[p] = 0
+        ranks[p] = max([topologicalRank(graph, u, ranks) + 1 for u in graph[p]] + [0])
+    return ranks[p]
+
+
+def sweepQueueSize(
+    *args,
+    durations: dict,
+    sizes: list,
+    tasks: Union[None, dict] = None,
+    cpuBudget: Union[None, int] = None,
+) -> dict:
+    """
+    Estimated makespan for a series of queue sizes, to see what `queueRestriction` is worth.
+
+    Parameters
+    ----------
+    args
+        Process node objects.
+    durations
+        Observed task durations keyed by process name.
+    sizes
+        Queue sizes to try.
+    tasks
+        Number of tasks per process, if different from the number of observations.
+    cpuBudget
+        Number of CPUs the running tasks can use together.
+
+    Returns
+    -------
+    Makespan for every queue size.
+    """
+
+    return dict(
+        [
+            (
+                size,
+                simulateMakespan(
+                    *args,
+                    durations=durations,
+                    tasks=tasks,
+                    queueSize=size,
+                    cpuBudget=cpuBudget,
+                )["makespan"],
+            )
+            for size in sizes
+        ]
+    )
+
+
+def reportMakespan(report: dict, verbose: bool = True) -> str:
+    """
+    Format the result of `simulateMakespan` as a short text report.
+
+    Parameters
+    ----------
+    report
+        The result of the simulation.
+    verbose
+        Print the report too.
+
+    Returns
+    -------
+    The report as a string.
+    """
+
+    path = []
+    for p in report["critical_path"]:
+        if len(path) == 0 or path[-1] != p:
+            path.append(p)
+    s = "Estimated makespan: {:.1f} s\n".format(report["makespan"])
+    s += "Critical path ({:.1f} s): ".format(report["critical_length"])
+    s += " -> ".join(path) + "\n\n"
+    s += "process\ttasks\tbusy (cpu*s)\tutilization\n"
+    for p, u in sorted(report["processes"].items(), key=lambda x: -x[1]["busy"]):
+        s += "{}\t{}\t{:.1f}\t{:.1%}\n".format(
+            p, u["tasks"], u["busy"], u["utilization"]
+        )
+    hint(verbose, s)
+    return s
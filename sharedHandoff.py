@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, shutil, tempfile
+import numpy as np
+import pandas as pd
+from typing import Union, Callable
+from . import chunkedStore, outputManifest
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import scipy.sparse as sparse
+    import scipy.io
+except ImportError:
+    sparse = None
+
+
+class MemmapArray(np.ndarray):
+    """
+    Annotation marker of array parameters that should always be opened memory-mapped
+    (read-only) instead of loaded into memory.
+    """
+
+
+sharedTypes = (
+    np.ndarray,
+    pd.DataFrame,
+    MemmapArray,
+)  # Annotations of parameters accepting segments
+
+sparseTypes = tuple()  # Annotations of parameters loaded as sparse matrices
+if sparse is not None:
+    sparseTypes = (
+        sparse.spmatrix,
+        sparse.csr_matrix,
+        sparse.csc_matrix,
+        sparse.coo_matrix,
+    )
+
+loadedTypes = (
+    sharedTypes + sparseTypes + (chunkedStore.chunkedReader,)
+)  # Annotations of parameters loaded from files
+
+
+def sharedDirectory() -> str:
+    """
+    Folder for shared segments: `INTROSPECT_SHM` if set, `/dev/shm` if it is available,
+    the temporary folder otherwise.
+
+    Returns
+    -------
+    Path to a (preferably tmpfs) folder.
+    """
+
+    dr = os.environ.get("INTROSPECT_SHM")
+    if dr in [None, ""]:
+        dr = "/dev/shm"
+        if not os.path.isdir(dr) or not os.access(dr, os.W_OK):
+            dr = tempfile.gettempdir()
+    return dr
+
+
+def isSegment(fn: str) -> bool:
+    """
+    Check if a file (or the target of a link) is a segment written by the executor.
+    """
+
+    prefix = os.path.join(os.path.realpath(sharedDirectory()), "introspect_")
+    return os.path.realpath(fn).startswith(prefix)
+
+
+def sharedExtension(r) -> Union[None, str]:
+    """
+    Binary format a result can be handed over in without parsing.
+
+    Parameters
+    ----------
+    r
+        A result of a process function.
+
+    Returns
+    -------
+    File extension of the format (`.npy` or `.arrow`), None if the result cannot be shared.
+    """
+
+    if isinstance(r, np.ndarray) and r.dtype != object:
+        return ".npy"
+    if isinstance(r, pd.DataFrame) and pa is not None:
+        return ".arrow"
+    return None
+
+
+def writeShared(r, fn: str) -> str:
+    """
+    Write an array as `.npy` or a data frame as an Arrow IPC file, so that consumers
+    can open it memory-mapped.
+
+    Parameters
+    ----------
+    r
+        The array or data frame.
+    fn
+        Path of the segment without extension.
+
+    Returns
+    -------
+    Path of the segment.
+    """
+
+    fn = fn + sharedExtension(r)
+    if fn[-4:] == ".npy":
+        np.save(fn, r, allow_pickle=False)
+    else:
+        table = pa.Table.from_pandas(r)
+        with pa.OSFile(fn, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    return fn
+
+
+def openShared(fn: str) -> Union[str, np.ndarray, pd.DataFrame]:
+    """
+    Open a shared segment memory-mapped. Anything else is returned as it is (a path).
+
+    Parameters
+    ----------
+    fn
+        Path to the segment (or a symlink pointing to it).
+
+    Returns
+    -------
+    A read-only array or a data frame backed by the mapped Arrow buffers. Only
+    fixed-width columns without nulls are wrapped without a copy; Arrow converts
+    other columns (nulls, strings with older pandas, nested types), so a data frame
+    can be a partial copy of the segment.
+    """
+
+    target = os.path.realpath(fn)
+    if target[-4:] == ".npy":
+        return np.load(target, mmap_mode="r")
+    if target[-6:] == ".arrow" and pa is not None:
+        source = pa.memory_map(target, "r")
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+    return fn
+
+
+class sharedSegments:
+    """
+    Reference counts of shared segments. When the last consumer has released a
+    segment, it is moved out of shared memory next to the link pointing to it (as a
+    hidden file keeping its extension), so that channel items stay valid after the run.
+    """
+
+    def __init__(self):
+        self.counts = dict()
+        self.links = dict()
+
+    def register(self, link: str, consumers: int) -> None:
+        fn = os.path.realpath(link)
+        self.counts[fn] = self.counts.get(fn, 0) + max(consumers, 0)
+        self.links[fn] = link
+
+    def release(self, fn: str) -> None:
+        fn = os.path.realpath(fn)
+        if fn not in self.counts:
+            return
+        self.counts[fn] -= 1
+        if self.counts[fn] < 1:
+            self.retire(fn)
+
+    def retire(self, fn: str) -> None:
+        """
+        Move a segment out of shared memory and point its link to the new place.
+        """
+
+        self.counts.pop(fn, None)
+        link = self.links.pop(fn, None)
+        if not os.path.isfile(fn):
+            return
+        if link is not None and os.path.islink(link):
+            if os.path.realpath(link) == fn:
+                dr, bn = os.path.split(link)
+                kept = os.path.join(dr, "." + bn + os.path.splitext(fn)[1])
+                shutil.move(fn, kept)
+                os.remove(link)
+                os.symlink(os.path.basename(kept), link)
+                return
+        os.remove(fn)
+
+    def cleanup(self) -> None:
+        for fn in list(self.counts.keys()):
+            self.retire(fn)
+
+
+def loadInput(fn: str, tp: type) -> Union[np.ndarray, pd.DataFrame]:
+    """
+    Load an input file as the type its parameter is annotated with. Binary formats
+    (`.npy`, Arrow IPC) are memory-mapped, text is parsed the way `save` writes it.
+    `-` reads a table from STDIN. Tables with a matching manifest are checked against
+    the row count recorded when they were written.
+
+    Parameters
+    ----------
+    fn
+        Path to the input file.
+    tp
+        Annotation of the parameter (`np.ndarray`, `MemmapArray`, `pd.DataFrame`,
+        a `scipy.sparse` matrix type or `chunkedStore.chunkedReader`).
+
+    Returns
+    -------
+    The loaded array, data frame or sparse matrix.
+    """
+
+    if tp in sparseTypes:
+        return loadSparse(fn, tp)
+    if tp is chunkedStore.chunkedReader:
+        return chunkedStore.chunkedReader(fn)
+    if fn == "-":
+        if tp is pd.DataFrame:
+            return pd.read_csv(sys.stdin, sep="\t", index_col=0)
+        return np.loadtxt(sys.stdin, delimiter="\t", ndmin=1)
+    ext = os.path.splitext(os.path.realpath(fn))[1].lower()
+    if ext in [".npy", ".arrow"]:
+        r = openShared(fn)
+        if isinstance(r, np.ndarray) and tp is pd.DataFrame:
+            r = pd.DataFrame(r)
+        if not isinstance(r, str):
+            return r
+    if tp is MemmapArray:
+        raise ValueError("Only .npy files can be memory-mapped, not " + fn + "!!!")
+    if ext == ".npz":
+        stored = np.load(fn)
+        return stored[stored.files[0]]
+    if ext in [".feather", ".parquet"]:
+        return getattr(pd, "read_" + ext[1:])(fn)
+    if ext in [".pkl", ".pickle"]:
+        return pd.read_pickle(fn)
+    sep = "," if ext == ".csv" else "\t"
+    if tp is pd.DataFrame:
+        r = pd.read_csv(fn, sep=sep, index_col=0)
+        manifest = outputManifest.readManifest(fn)
+        if manifest is not None and manifest.get("rows", len(r)) != len(r):
+            raise ValueError(
+                "Table "
+                + fn
+                + " has "
+                + str(len(r))
+                + " rows, but its manifest lists "
+                + str(manifest["rows"])
+                + "!!!"
+            )
+        return r
+    return np.loadtxt(fn, delimiter=sep, ndmin=1)
+
+
+def loadSparse(fn: str, tp: type):
+    """
+    Load a sparse matrix saved as `.npz` (`scipy.sparse.save_npz`) or Matrix Market
+    (`.mtx`), in the format the parameter is annotated with (CSR for `spmatrix`).
+
+    Parameters
+    ----------
+    fn
+        Path to the input file.
+    tp
+        Annotation of the parameter.
+
+    Returns
+    -------
+    The sparse matrix.
+    """
+
+    if fn == "-":
+        r = scipy.io.mmread(sys.stdin.buffer)
+    elif os.path.splitext(fn)[1].lower() in [".mtx", ".gz"]:
+        r = scipy.io.mmread(fn)
+    else:
+        r = sparse.load_npz(fn)
+    if tp is sparse.spmatrix:
+        tp = sparse.csr_matrix
+    return tp(r)
+
+
+class lazyInput:
+    """
+    Proxy of an input file that is loaded on first use (attribute access, indexing,
+    iteration, operators or conversion to an array), so that unused inputs cost
+    nothing. The proxy reports the annotated class, so `isinstance` checks pass, and
+    NumPy and pandas functions receive the loaded object. The loader can be swapped,
+    e.g. for the node-local cache of `inputCache`.
+    """
+
+    def __init__(self, fn: str, tp: type, loader: Union[None, Callable] = None):
+        self._fn = fn
+        self._tp = tp
+        if loader is None:
+            loader = loadInput
+        self._loader = loader
+        self._value = None
+
+    def load(self) -> Union[np.ndarray, pd.DataFrame]:
+        if self._value is None:
+            self._value = self._loader(self._fn, self._tp)
+        return self._value
+
+    @property
+    def __class__(self):
+        if self._value is None:
+            return self._tp
+        return self._value.__class__
+
+    def __getattr__(self, name):
+        if name in ["_fn", "_tp", "_loader", "_value"]:
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __setitem__(self, key, value):
+        self.load()[key] = value
+
+    def __len__(self):
+        return len(self.load())
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __contains__(self, item):
+        return item in self.load()
+
+    def __bool__(self):
+        return bool(self.load())
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.load(), dtype=dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [loaded(x) for x in inputs]
+        if "out" in kwargs:
+            kwargs["out"] = tuple([loaded(x) for x in kwargs["out"]])
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        args = [loaded(x) for x in args]
+        kwargs = dict([(k, loaded(v)) for k, v in kwargs.items()])
+        return func(*args, **kwargs)
+
+    def __reduce__(self):
+        return (lazyInput, (self._fn, self._tp, self._loader))  # Loaded again by workers
+
+    def __repr__(self):
+        if self._value is None:
+            return "lazyInput(" + repr(self._fn) + ")"
+        return repr(self._value)
+
+    def __fspath__(self):
+        return self._fn
+
+
+def loaded(x):
+    """
+    The loaded object behind a `lazyInput` (also inside lists and tuples), anything
+    else as it is.
+    """
+
+    if type(x) is lazyInput:
+        return x.load()
+    if type(x) in [list, tuple]:
+        return type(x)([loaded(e) for e in x])
+    return x
+
+
+def lazyOperator(name: str) -> Callable:
+    """
+    Forward an operator of `lazyInput` to the loaded object.
+    """
+
+    def operator(self, *other):
+        method = getattr(self.load(), name, None)
+        if method is None:
+            return NotImplemented
+        return method(*[loaded(x) for x in other])
+
+    return operator
+
+
+for op in [
+    "add",
+    "sub",
+    "mul",
+    "matmul",
+    "truediv",
+    "floordiv",
+    "mod",
+    "pow",
+    "and",
+    "or",
+    "xor",
+]:
+    for prefix in ["", "r", "i"]:
+        name = "__" + prefix + op + "__"
+        setattr(lazyInput, name, lazyOperator(name))
+for op in ["eq", "ne", "lt", "le", "gt", "ge", "neg", "pos", "abs", "invert"]:
+    setattr(lazyInput, "__" + op + "__", lazyOperator("__" + op + "__"))
+del op, prefix, name
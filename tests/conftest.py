@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, sys, importlib.util
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "introSpect" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "introSpect",
+        os.path.join(root, "__init__.py"),
+        submodule_search_locations=[root],
+    )  # The checkout folder does not have to be called introSpect
+    introSpect = importlib.util.module_from_spec(spec)
+    sys.modules["introSpect"] = introSpect
+    spec.loader.exec_module(introSpect)
+
+
+@pytest.fixture
+def diamond():
+    """
+    Nodes of the diamond-shaped benchmark pipeline of the local executor.
+    """
+
+    localExecutor = sys.modules["introSpect"].localExecutor
+    return [
+        localExecutor.diamondSource(
+            inchannels=["diamond_items"],
+            outchannels=[("diamond_left", "diamond_right")],
+        ),
+        localExecutor.diamondLeft(outchannels=["diamond_joined_left"]),
+        localExecutor.diamondRight(outchannels=["diamond_joined_right"]),
+        localExecutor.diamondJoin(outchannels=["diamond_sums"]),
+    ]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import introSpect
+
+Checkpoint = introSpect.checkpoints.Checkpoint
+outputs = {"outFile": (1, "-o", "--outFile", {"dest": "outFile"})}
+
+
+def countTo(n: int, state: Checkpoint) -> int:
+    """
+    Count up to a number, saving every step.
+
+    Parameters
+    ----------
+    n
+        Number to count to.
+    state
+        Checkpoint of the count.
+    """
+
+    for i in range(state.load(default=0), n):
+        state.save(i + 1)
+    return state.load()
+
+
+def preempted(n: int, state: Checkpoint) -> str:
+    """
+    Fail after saving progress the first time, resume from it the second time.
+
+    Parameters
+    ----------
+    n
+        Progress saved.
+    state
+        Checkpoint of the progress.
+    """
+
+    step = state.load(default=0)
+    if step == 0:
+        state.save(n)
+        raise RuntimeError("preempted")
+    return "resumed from " + str(step)
+
+
+def test_checkpoint_resume(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(introSpect.checkpoints.checkpointVariable, raising=False)
+    mainFunction = introSpect.commandLines.cmdConnect(preempted, outputs)
+    with pytest.raises(RuntimeError):
+        mainFunction.eval(["7"])
+    mainFunction.eval(["7"])
+    assert mainFunction.results[0][1] == "resumed from 7"
+
+
+def test_checkpoint_of_other_inputs_discarded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(introSpect.checkpoints.checkpointVariable, raising=False)
+    mainFunction = introSpect.commandLines.cmdConnect(preempted, outputs)
+    with pytest.raises(RuntimeError):
+        mainFunction.eval(["7"])
+    with pytest.raises(RuntimeError):
+        mainFunction.eval(["8"])
+    mainFunction.eval(["8"])
+    assert mainFunction.results[0][1] == "resumed from 8"
+
+
+def test_checkpoint_per_chunk_element(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(introSpect.checkpoints.checkpointVariable, raising=False)
+    mainFunction = introSpect.commandLines.cmdConnect(
+        countTo, outputs, chunked=["n"]
+    )
+    mainFunction.eval(["5,2,3"])
+    assert [r for fn, r in mainFunction.results] == [5, 2, 3]
+
+
+def test_checkpoint_save_and_clear(tmp_path):
+    state = Checkpoint(str(tmp_path / "c"))
+    assert state.load(default="none") == "none"
+    state.save({"a": 1})
+    state.save(introSpect.checkpoints.np.arange(3))
+    assert state.load().tolist() == [0, 1, 2]
+    assert state.part(1).load() is None
+    state.part(1).save(2)
+    assert Checkpoint(str(tmp_path / "c")).part(1).load() == 2
+    state.clear()
+    assert not state.exists()
+    assert not state.part(1).exists()
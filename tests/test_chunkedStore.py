@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+import pytest
+import introSpect
+
+chunkedStore = introSpect.chunkedStore
+
+
+def test_chunked_reader_slicing(tmp_path):
+    expected = np.arange(30).reshape(10, 3)
+    store = chunkedStore.chunkedArray(chunk_rows=4, path=str(tmp_path / "tmp"))
+    for block in [expected[:3], expected[3:4], expected[4:10]]:
+        store.append(block)
+    path = store.finalize(str(tmp_path / "store"))
+    x = chunkedStore.chunkedReader(path)
+    assert len(x) == 10 and x.shape == (10, 3)
+    assert len(x.files) == 3
+    assert np.array_equal(np.concatenate(list(x)), expected)
+    for key in [
+        slice(None),
+        slice(2, 7),
+        slice(4, 8),
+        slice(3, 3),
+        slice(-3, None),
+        slice(None, None, 3),
+        slice(8, 1, -2),
+        slice(20, 30),
+    ]:
+        assert np.array_equal(x[key], expected[key])
+    assert np.array_equal(x[7], expected[7])
+    assert np.array_equal(x[-1], expected[-1])
+    assert np.array_equal(x[2:9, 1], expected[2:9, 1])
+    assert np.array_equal(x[5, 1:], expected[5, 1:])
+    assert np.array_equal(x[[9, 0, 4]], expected[[9, 0, 4]])
+    assert np.array_equal(np.asarray(x), expected)
+    with pytest.raises(IndexError):
+        x[10]
+
+
+def test_discard_on_error(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(RuntimeError):
+        with chunkedStore.discardOnError():
+            store = chunkedStore.chunkedArray()
+            store.append(np.ones(3))
+            raise RuntimeError("failed")
+    assert os.listdir(tmp_path) == []
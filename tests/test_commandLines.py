@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os, time, json, signal, asyncio
+import numpy as np
+import pytest
+import introSpect
+
+commandLines = introSpect.commandLines
+outputs = {"outFile": (1, "-o", "--outFile", {"dest": "outFile"})}
+
+
+def greet(name: str) -> str:
+    """
+    Greet someone.
+
+    Parameters
+    ----------
+    name
+        Who to greet.
+    """
+
+    return "Hello " + name
+
+
+def total(x: np.ndarray) -> float:
+    """
+    Sum of an array.
+
+    Parameters
+    ----------
+    x
+        The array.
+    """
+
+    return float(np.sum(x))
+
+
+def test_standalone_blockers():
+    cmd = commandLines.cmdConnect(greet, outputs)
+    assert commandLines.standaloneBlockers(cmd) == []
+    assert len(commandLines.standaloneBlockers(cmd, manifest=True)) == 1
+    assert len(commandLines.standaloneBlockers(cmd, cached=True)) == 1
+    cmd = commandLines.cmdConnect(total, outputs)
+    assert len(commandLines.standaloneBlockers(cmd)) == 1
+    assert "main()" in commandLines.endScriptStandalone(greet, outputs)
+    with pytest.raises(ValueError):
+        commandLines.endScriptStandalone(total, outputs)
+
+
+def test_mapped_calls_split_arrays():
+    cmd = commandLines.cmdConnect(total, outputs, mapped=["x"])
+    cmd.map_chunksize = 4
+    calls = cmd.mappedCalls([np.arange(10)], dict())
+    assert [a[0].tolist() for a, kw in calls] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert cmd.mappedCalls([None], dict()) == [([None], dict())]
+
+
+async def halve(x: int) -> float:
+    if x == 0:
+        raise ZeroDivisionError("zero")
+    if x < 0:
+        raise commandLines.TaskCancelled(signal.SIGTERM)
+    return 1 / x
+
+
+def test_gather_bounded():
+    gather = commandLines.gatherBounded
+    rs = asyncio.run(gather((halve(x) for x in [1, 2, 4]), limit=2))
+    assert rs == [1.0, 0.5, 0.25]
+    rs = asyncio.run(gather([halve(x) for x in [1, 0]], return_exceptions=True))
+    assert isinstance(rs[1], ZeroDivisionError)
+    with pytest.raises(commandLines.TaskCancelled):
+        asyncio.run(gather([halve(x) for x in [1, -1, 2]], return_exceptions=True))
+
+
+@commandLines.mapOver("xs", chunksize=3)
+def doubled(xs: list) -> list:
+    """
+    Double every number.
+
+    Parameters
+    ----------
+    xs
+        The numbers.
+    """
+
+    return [2 * int(x) for x in xs]
+
+
+def test_chunk_split_and_merge_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mainFunction = commandLines.cmdConnect(greet, outputs, chunked=["name"])
+    mainFunction.eval(["c,a,b", "-o", "g.txt"])
+    mainFunction.save()
+    assert [fn for fn, r in mainFunction.results] == [
+        "g_000000.txt",
+        "g_000001.txt",
+        "g_000002.txt",
+    ]
+    assert [open(fn).read() for fn in sorted(tmp_path.glob("g_*.txt"))] == [
+        "Hello c",
+        "Hello a",
+        "Hello b",
+    ]
+    mainFunction = commandLines.cmdConnect(greet, outputs, chunked=["name"])
+    mainFunction.eval(["c,a", "-o", "g.txt", "--chunkLabels", "k1,k0"])
+    assert [fn for fn, r in mainFunction.results] == ["g_k1.txt", "g_k0.txt"]
+    mainFunction = commandLines.cmdConnect(doubled, outputs)
+    assert mainFunction.mapped == ["xs"]
+    mainFunction.eval(["1,2,3,4,5,6,7,8"])
+    assert mainFunction.results[0][1] == [2, 4, 6, 8, 10, 12, 14, 16]
+    merged = commandLines.mergeParts([np.arange(2), np.arange(2, 5)])
+    assert merged.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_cancellation_exit_code(tmp_path):
+    marker = str(tmp_path / "cancelled")
+    with pytest.raises(SystemExit) as e:
+        with commandLines.cancellable(marker):
+            os.kill(os.getpid(), signal.SIGUSR1)
+            time.sleep(5)
+    assert e.value.code == commandLines.cancelledExit == 75
+    with open(marker) as f:
+        assert json.load(f)["signal"] == "SIGUSR1"
+    assert signal.getsignal(signal.SIGUSR1) is signal.SIG_DFL
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import introSpect
+
+flowNodes = introSpect.flowNodes
+
+
+def shout(s: str) -> str:
+    return s.upper()
+
+
+class greeter(flowNodes.nextflowProcess):
+    """
+    Greet someone.
+    """
+
+    def channel_specifications(self):
+        return {
+            "greeting": ("val", "greeting", "greeting", None, True),
+            "greeted": ("file", "'greeted.txt'", "outFile", None, False),
+        }
+
+    def process(self, greeting: str, name: str) -> str:
+        """
+        Greet someone.
+
+        Parameters
+        ----------
+        greeting
+            The greeting.
+        name
+            Who to greet.
+        """
+
+        return greeting + name
+
+
+def sweptGreeter(helped=False, **kws):
+    class greeter(flowNodes.nextflowProcess):
+        def channel_specifications(self):
+            return {
+                "greeting": ("val", "greeting", "greeting", None, True),
+                "greeted": ("file", "'greeted.txt'", "outFile", None, False),
+            }
+
+        def dependencies(self):
+            return {"helpers": [shout] if helped else []}
+
+        def process(self, greeting: str, name: str) -> str:
+            return greeting + " " + name
+
+    return greeter(
+        inchannels=["greeting"],
+        outchannels=["greeted"],
+        sweep={"name": ["x", "y"]},
+        **kws
+    )
+
+
+def test_sweep_keys():
+    node = greeter(
+        inchannels=["greeting"], outchannels=["greeted"], sweep={"name": ["x", "y"]}
+    )
+    node.pipeline_params = {"greeting": "Hi"}
+    keys = [c[0] for c in node.sweep_combinations()[0]]
+    assert len(set(keys)) == 2
+    assert keys == [c[0] for c in node.sweep_combinations()[0]]
+    node.pipeline_params = {"greeting": "Hello"}
+    assert set(keys).isdisjoint([c[0] for c in node.sweep_combinations()[0]])
+    node.pipeline_params = {"greeting": "Hi"}
+    other = sweptGreeter()
+    other.pipeline_params = {"greeting": "Hi"}
+    assert other.processname == node.processname
+    assert set(keys).isdisjoint([c[0] for c in other.sweep_combinations()[0]])
+    helped = sweptGreeter(helped=True)
+    helped.pipeline_params = {"greeting": "Hi"}
+    assert helped.sweep_context()["code"] != other.sweep_context()["code"]
+    assert helped.sweep_context()["params"] == other.sweep_context()["params"]
+
+
+def test_sweep_cache_lookup(tmp_path):
+    node = greeter(
+        inchannels=["greeting"],
+        outchannels=["greeted"],
+        sweep={"name": ["x", "y"]},
+        sweep_cache=str(tmp_path),
+    )
+    node.pipeline_params = {"greeting": "Hi"}
+    combinations, cached = node.sweep_combinations()
+    assert len(combinations) == 2 and cached == {"greeted": []}
+    fn = flowNodes.commandLines.chunkedFileName("greeted.txt", combinations[0][0])
+    (tmp_path / fn).write_text("Hi x")
+    combinations, cached = node.sweep_combinations()
+    assert [c[1] for c in combinations] == ["y"]
+    assert cached == {"greeted": [str(tmp_path / fn)]}
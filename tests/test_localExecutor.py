@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pytest
+import introSpect
+
+localExecutor = introSpect.localExecutor
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_diamond(tmp_path, diamond, workers):
+    items = [300, 100, 200]
+    cwd = os.getcwd()
+    channels = localExecutor.runLocally(
+        *diamond,
+        location=str(tmp_path),
+        main_kws={"diamond_items": items},
+        workers=workers,
+        verbose=False,
+    )
+    assert len(channels["diamond_left"]) == len(channels["diamond_right"]) == 3
+    sums = []
+    for fn in channels["diamond_sums"]:
+        with open(fn) as f:
+            sums.append(int(f.read()))
+        with open(os.path.dirname(fn) + "/.exitcode") as f:
+            assert f.read() == "0"
+    expected = [2 * localExecutor.spin(n) for n in items]
+    if workers == 1:
+        assert sums == expected
+    else:  # Branches may finish in any order, joins pair items by arrival
+        assert sum(sums) == sum(expected)
+    assert os.getcwd() == cwd
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pandas as pd
+import introSpect
+
+outputManifest = introSpect.outputManifest
+outputs = {"outFile": (1, "-o", "--outFile", {"dest": "outFile"})}
+
+
+def table(n: int) -> pd.DataFrame:
+    """
+    A table of squares.
+
+    Parameters
+    ----------
+    n
+        Number of rows.
+    """
+
+    return pd.DataFrame({"x": range(n), "y": [i * i for i in range(n)]})
+
+
+def test_manifest_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mainFunction = introSpect.commandLines.cmdConnect(table, outputs)
+    mainFunction.eval(["10", "-o", "t.tsv"])
+    mainFunction.save(manifest=True)
+    manifest = outputManifest.readManifest("t.tsv")
+    assert manifest["rows"] == 10 and manifest["lines"] == 11
+    assert manifest["size"] == os.path.getsize("t.tsv")
+    assert manifest["checksum"] == outputManifest.fileDigest("t.tsv")["checksum"]
+    os.symlink("t.tsv", "link.tsv")
+    assert outputManifest.readManifest("link.tsv") == manifest
+    with open("t.tsv", "a") as f:
+        f.write("changed\n")
+    assert outputManifest.readManifest("t.tsv") is None
+
+
+def test_manifest_of_peeked_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mainFunction = introSpect.commandLines.cmdConnect(table, outputs)
+    mainFunction.eval(["10", "-o", "t.tsv", "--peek", "3"])
+    mainFunction.save(manifest=True)
+    manifest = outputManifest.readManifest("t.tsv")
+    assert "rows" not in manifest and manifest["lines"] == 4
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import introSpect
+
+pipelineSimulator = introSpect.pipelineSimulator
+durations = {
+    "diamondSource": [1.0, 1.0],
+    "diamondLeft": [2.0, 2.0],
+    "diamondRight": [3.0, 3.0],
+    "diamondJoin": [1.0, 1.0],
+}
+
+
+def test_pipeline_graph(diamond):
+    assert pipelineSimulator.pipelineGraph(*diamond) == {
+        "diamondSource": [],
+        "diamondLeft": ["diamondSource"],
+        "diamondRight": ["diamondSource"],
+        "diamondJoin": ["diamondLeft", "diamondRight"],
+    }
+
+
+def test_simulate_makespan(diamond):
+    report = pipelineSimulator.simulateMakespan(*diamond, durations=durations)
+    assert report["makespan"] == 5.0
+    assert report["critical_path"] == ["diamondSource", "diamondRight", "diamondJoin"]
+    assert report["critical_length"] == 5.0
+    assert report["processes"]["diamondRight"]["busy"] == 6.0
+    serial = pipelineSimulator.simulateMakespan(
+        *diamond, durations=durations, queueSize=1
+    )
+    assert serial["makespan"] == 14.0
+    budget = pipelineSimulator.simulateMakespan(
+        *diamond, durations=durations, cpuBudget=2
+    )
+    assert 5.0 <= budget["makespan"] < 14.0
+    tasks = pipelineSimulator.simulateMakespan(
+        *diamond, durations=durations, tasks={"diamondJoin": 1}
+    )
+    assert tasks["makespan"] == 5.0
+    with pytest.raises(ValueError):
+        pipelineSimulator.simulateMakespan(
+            *diamond, durations=durations, queueSize=0
+        )
+
+
+def test_parse_duration():
+    assert pipelineSimulator.parseDuration("1h 2m 3.5s") == 3723.5
+    assert pipelineSimulator.parseDuration("250ms") == 0.25
+    assert pipelineSimulator.parseDuration("1500") == 1.5
+    assert pipelineSimulator.parseDuration("-") == 0.0
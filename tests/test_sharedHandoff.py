@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pickle
+import numpy as np
+import pandas as pd
+import introSpect
+
+sharedHandoff = introSpect.sharedHandoff
+
+
+def sumRows(x: np.ndarray) -> float:
+    """
+    Sum of an array.
+
+    Parameters
+    ----------
+    x
+        The array.
+    """
+
+    return float(np.sum(x))
+
+
+def test_lazyInput_pickles(tmp_path):
+    np.save(tmp_path / "x.npy", np.arange(4))
+    x = sharedHandoff.lazyInput(str(tmp_path / "x.npy"), np.ndarray)
+    y = pickle.loads(pickle.dumps(x))
+    assert isinstance(y, np.ndarray)
+    assert y.sum() == 6
+
+
+def test_lazyInput_behaves_like_its_value(tmp_path):
+    np.save(tmp_path / "x.npy", np.arange(6.0).reshape(2, 3))
+    pd.DataFrame({"a": [1, 2]}).to_csv(tmp_path / "d.tsv", sep="\t")
+    x = sharedHandoff.lazyInput(str(tmp_path / "x.npy"), np.ndarray)
+    assert isinstance(x, np.ndarray)
+    assert (1 + x)[1, 2] == 6
+    assert (np.ones(2) @ x).tolist() == [3.0, 5.0, 7.0]
+    assert (-x)[0, 1] == -1
+    d = sharedHandoff.lazyInput(str(tmp_path / "d.tsv"), pd.DataFrame)
+    assert isinstance(d, pd.DataFrame)
+    assert pd.concat([d, d]).shape == (4, 1)
+
+
+def test_chunked_array_input_in_pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(3):
+        np.save("a" + str(i) + ".npy", np.arange(i + 2))
+    mainFunction = introSpect.commandLines.cmdConnect(
+        sumRows,
+        {"outFile": (1, "-o", "--outFile", {"dest": "outFile"})},
+        chunked=["x"],
+        chunk_workers=2,
+    )
+    mainFunction.eval(["a0.npy,a1.npy,a2.npy"])
+    assert [r for fn, r in mainFunction.results] == [1.0, 3.0, 6.0]